@@ -0,0 +1,49 @@
+"""
+Compares the audit plugin's envelope serialization modes and per-record codecs on generated SOAP envelopes: time
+spent on the request thread (serialization), time spent by the writer (compression) and stored size.
+
+    python benchmarks/bench_audit_serialization.py [envelope count]
+"""
+import sys
+import time
+
+from lxml import etree
+
+from python3_commons.audit import SerializationMode, serialize_envelope
+from python3_commons.compression import compress
+
+from bench_codecs import generate_envelopes
+
+RECORD_CODECS = (None, 'gzip', 'zstd')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    parser = etree.XMLParser(remove_blank_text=True)
+    envelopes = [etree.fromstring(data, parser) for _, _, data in generate_envelopes(count)]
+    print(f'{count} envelopes')
+
+    for mode in SerializationMode:
+        started = time.perf_counter()
+        serialized = [serialize_envelope(envelope, mode) for envelope in envelopes]
+        serialize_elapsed = time.perf_counter() - started
+        size = sum(map(len, serialized))
+
+        for codec in RECORD_CODECS:
+            try:
+                started = time.perf_counter()
+                stored_size = sum(len(compress(data, codec)) for data in serialized) if codec else size
+                compress_elapsed = time.perf_counter() - started
+            except RuntimeError as e:
+                print(f'{mode:7} {codec:5} skipped: {e}')
+                continue
+
+            print(
+                f'{mode:7} {codec or "-":5}: request thread {serialize_elapsed / count * 1e6:6.1f} us/envelope, '
+                f'writer {compress_elapsed / count * 1e6:6.1f} us/envelope, '
+                f'stored {stored_size / count:7.0f} bytes/envelope'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Reports compression ratio and throughput of the archive codecs on a tar stream of generated SOAP envelopes, both
+single-threaded and with parallel block compression on all cores.
+
+    python benchmarks/bench_codecs.py [envelope count]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from python3_commons.audit import generate_archive
+from python3_commons.compression import CODECS, generate_compressed, generate_compressed_parallel
+
+ENVELOPE = '''<?xml version='1.0' encoding='UTF-8'?>
+<soap-env:Envelope xmlns:soap-env="http://schemas.xmlsoap.org/soap/envelope/">
+  <soap-env:Header>
+    <wsa:MessageID xmlns:wsa="http://www.w3.org/2005/08/addressing">urn:uuid:{uuid}</wsa:MessageID>
+  </soap-env:Header>
+  <soap-env:Body>
+    <ns0:{operation}Response xmlns:ns0="http://example.com/payments/v1">
+      <ns0:Result>
+        <ns0:TransactionId>{transaction_id}</ns0:TransactionId>
+        <ns0:Amount currency="EUR">{amount}</ns0:Amount>
+        <ns0:Status>{status}</ns0:Status>
+        <ns0:Timestamp>{timestamp}</ns0:Timestamp>
+        <ns0:Items>
+{items}
+        </ns0:Items>
+      </ns0:Result>
+    </ns0:{operation}Response>
+  </soap-env:Body>
+</soap-env:Envelope>
+'''
+ITEM = '''          <ns0:Item>
+            <ns0:Code>{code}</ns0:Code>
+            <ns0:Description>{description}</ns0:Description>
+            <ns0:Quantity>{quantity}</ns0:Quantity>
+          </ns0:Item>'''
+LEVELS = {
+    'bz2': (1, 9),
+    'gzip': (1, 6, 9),
+    'xz': (0, 6),
+    'zstd': (1, 3, 9, 19),
+}
+
+
+def generate_envelopes(count: int):
+    rnd = random.Random(42)
+    started = datetime(2024, 5, 3)
+
+    for i in range(count):
+        operation = rnd.choice(('GetPayment', 'CreatePayment', 'GetBalance', 'Ping'))
+        items = '\n'.join(
+            ITEM.format(code=rnd.randint(1000, 9999), description=f'Item {rnd.randint(1, 500)}',
+                        quantity=rnd.randint(1, 10))
+            for _ in range(rnd.randint(0, 20))
+        )
+        timestamp = started + timedelta(seconds=i)
+        envelope = ENVELOPE.format(
+            uuid=f'{rnd.getrandbits(128):032x}', operation=operation, transaction_id=rnd.getrandbits(64),
+            amount=f'{rnd.randint(1, 100000) / 100:.2f}', status=rnd.choice(('OK', 'PENDING', 'FAILED')),
+            timestamp=timestamp.isoformat(), items=items
+        )
+
+        yield f'audit/2024/05/03/zeep/{operation}/{i:08}_egress.xml', timestamp, envelope.encode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tar_data = b''.join(generate_archive(generate_envelopes(count), chunk_size=1024 * 1024))
+    chunks = [tar_data[i:i + 1024 * 1024] for i in range(0, len(tar_data), 1024 * 1024)]
+    workers = os.cpu_count()
+    print(f'{count} envelopes, {len(tar_data) / 1024 / 1024:.1f} MiB of tar data')
+
+    for codec_name, codec in CODECS.items():
+        for level in LEVELS[codec_name]:
+            try:
+                started = time.perf_counter()
+                compressed_size = sum(map(len, generate_compressed(chunks, codec, level)))
+                elapsed = time.perf_counter() - started
+            except RuntimeError as e:
+                print(f'{codec_name:5} skipped: {e}')
+                break
+
+            started = time.perf_counter()
+            parallel_size = sum(map(len, generate_compressed_parallel(chunks, codec, level, workers=workers)))
+            parallel_elapsed = time.perf_counter() - started
+
+            print(
+                f'{codec_name:5} level {level:2}: ratio {len(tar_data) / compressed_size:6.2f} '
+                f'{len(tar_data) / elapsed / 1024 / 1024:8.1f} MiB/s, '
+                f'{workers} workers: ratio {len(tar_data) / parallel_size:6.2f} '
+                f'{len(tar_data) / parallel_elapsed / 1024 / 1024:8.1f} MiB/s'
+            )
+
+
+if __name__ == '__main__':
+    main()
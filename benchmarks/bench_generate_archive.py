@@ -0,0 +1,70 @@
+"""
+Compares the throughput of generate_archive with the previous tarfile + BytesIO based implementation on generated
+SOAP envelopes and on larger objects, and checks both produce the same bytes.
+
+    python benchmarks/bench_generate_archive.py [envelope count]
+"""
+import io
+import sys
+import tarfile
+import time
+from datetime import datetime
+from typing import Generator, Iterable
+
+from python3_commons.audit_archive import generate_archive
+
+from bench_codecs import generate_envelopes
+
+
+def generate_archive_bytesio(objects: Iterable[tuple[str, datetime, bytes]],
+                             chunk_size: int = 4096) -> Generator[bytes, None, None]:
+    buffer = io.BytesIO()
+
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        for name, last_modified, content in objects:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = last_modified.timestamp()
+            archive.addfile(info, io.BytesIO(content))
+
+            buffer.seek(0)
+
+            while chunk := buffer.read(chunk_size):
+                yield chunk
+
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    buffer.seek(0)
+
+    while chunk := buffer.read(chunk_size):
+        yield chunk
+
+
+def measure(generator) -> tuple[float, int]:
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in generator)
+
+    return time.perf_counter() - started, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    envelopes = list(generate_envelopes(count))
+    large = [(f'audit/large_{i}.bin', datetime(2024, 5, 3), bytes([i]) * 16 * 1024 * 1024) for i in range(16)]
+
+    for label, objects in ((f'{count} envelopes', envelopes), ('16 x 16 MiB objects', large)):
+        for name, generator_factory in (
+            ('tarfile + BytesIO, 4 KiB chunks', lambda: generate_archive_bytesio(objects)),
+            ('tarfile + BytesIO, 1 MiB chunks', lambda: generate_archive_bytesio(objects, 1024 * 1024)),
+            ('generate_archive', lambda: generate_archive(objects)),
+        ):
+            elapsed, size = measure(generator_factory())
+            print(f'{label:20} {name:32}: {size / elapsed / 1024 / 1024:9.1f} MiB/s')
+
+        reference = b''.join(generate_archive_bytesio(objects, 1024 * 1024))
+        print(f'{label:20} identical output: {b"".join(generate_archive(objects)) == reference}')
+
+
+if __name__ == '__main__':
+    main()
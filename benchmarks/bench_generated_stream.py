@@ -0,0 +1,106 @@
+"""
+Compares GeneratedStream with the previous BytesIO based implementation for the read sizes used by the archiver
+(5 MiB parts) and by tests/test_audit.py (2 bytes). The byte count column shows how much data each implementation
+actually returned.
+
+    python benchmarks/bench_generated_stream.py
+"""
+import io
+import os
+import time
+from typing import Generator, Iterable
+
+from python3_commons.audit import GeneratedStream
+
+
+class BytesIOGeneratedStream(io.BytesIO):
+    def __init__(self, generator: Generator[bytes, None, None], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generator = generator
+
+    def read(self, size: int = -1):
+        if size < 0:
+            while True:
+                try:
+                    chunk = next(self.generator)
+                except StopIteration:
+                    break
+                else:
+                    self.write(chunk)
+        else:
+            total_written_size = 0
+
+            while total_written_size < size:
+                try:
+                    chunk = next(self.generator)
+                except StopIteration:
+                    break
+                else:
+                    self.write(chunk)
+                    total_written_size += len(chunk)
+
+        self.seek(0)
+
+        if chunk := super().read(size):
+            pos = self.tell()
+
+            buf = self.getbuffer()
+            unread_data_size = len(buf) - pos
+
+            if unread_data_size > 0:
+                buf[:unread_data_size] = buf[pos:pos+unread_data_size]
+
+            del buf
+
+            self.seek(0)
+            self.truncate(unread_data_size)
+
+        return chunk
+
+    def readable(self):
+        return True
+
+
+def generate_chunks(total_size: int, chunk_size: int) -> Generator[bytes, None, None]:
+    chunk = os.urandom(chunk_size)
+
+    for _ in range(total_size // chunk_size):
+        yield chunk
+
+
+def consume(stream, read_size: int) -> int:
+    total_size = 0
+
+    while chunk := stream.read(read_size):
+        total_size += len(chunk)
+
+    return total_size
+
+
+def bench(stream_class, chunks: Iterable[bytes], read_size: int) -> tuple[float, int]:
+    started = time.perf_counter()
+    total_size = consume(stream_class(iter(chunks)), read_size)
+
+    return time.perf_counter() - started, total_size
+
+
+def main():
+    cases = (
+        ('5 MiB reads of 1 MiB chunks', 256 * 1024 * 1024, 1024 * 1024, 5 * 1024 * 1024),
+        ('5 MiB reads of 16 MiB chunks', 256 * 1024 * 1024, 16 * 1024 * 1024, 5 * 1024 * 1024),
+        ('2 byte reads of 4 KiB chunks', 512 * 1024, 4096, 2),
+    )
+
+    for title, total_size, chunk_size, read_size in cases:
+        chunks = list(generate_chunks(total_size, chunk_size))
+
+        for stream_class in (BytesIOGeneratedStream, GeneratedStream):
+            elapsed, size = bench(stream_class, chunks, read_size)
+            print(
+                f'{title:32} {stream_class.__name__:24} {size:>12} bytes {elapsed:8.3f}s '
+                f'{size / elapsed / 1024 / 1024:10.1f} MiB/s'
+            )
+
+
+if __name__ == '__main__':
+    main()
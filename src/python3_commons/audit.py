@@ -1,173 +1,665 @@
 import asyncio
+import atexit
+import contextvars
 import io
 import logging
-import tarfile
-from bz2 import BZ2Compressor
-from datetime import datetime, timedelta, UTC
-from typing import Generator, Iterable
-from uuid import uuid4
+import random
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum
+from queue import SimpleQueue
+from typing import TYPE_CHECKING, Callable
 
 from lxml import etree
 from minio import S3Error
 from zeep.plugins import Plugin
 from zeep.wsdl.definitions import AbstractOperation
 
-from python3_commons import object_storage
-from python3_commons.conf import S3Settings, s3_settings
+from python3_commons import audit_keys, audit_segments, object_storage
+from python3_commons.audit_archive import (  # noqa: F401
+    GeneratedStream, archive_audit_data, fetch_archived_audit, generate_archive, generate_archive_stream, generate_bzip2
+)
+from python3_commons.conf import S3Settings, audit_settings, s3_settings
 from python3_commons.object_storage import ObjectStorage
 
+if TYPE_CHECKING:
+    from python3_commons.audit_spool import AuditSpool
+
 logger = logging.getLogger(__name__)
 
+_audit_executor: ThreadPoolExecutor | None = None
+_audit_executor_lock = threading.Lock()
+_in_flight_limits: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = \
+    weakref.WeakKeyDictionary()
+_loop_sinks: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AuditSink]' = weakref.WeakKeyDictionary()
+_background_sink: 'ThreadedAuditSink | None' = None
+_background_sink_lock = threading.Lock()
+# Sampling decision of the exchange in progress in this thread or task: (plugin id, operation name, sampled)
+_exchange_sample: contextvars.ContextVar[tuple[int, str, bool] | None] = contextvars.ContextVar(
+    'audit_exchange_sample', default=None
+)
+
+
+def write_audit_data_sync(settings: S3Settings, key: str, data: bytes) -> bool:
+    """
+    Stores one audit record. Records with a compressed key (`.xml.gz`, `.xml.zst`) are passed around uncompressed and
+    only compressed here, off the request path, see `audit_keys.get_record_codec`.
+    """
+    if settings.s3_secret_access_key:
+        try:
+            client = ObjectStorage(settings).get_client()
+            absolute_path = object_storage.get_absolute_path(f'audit/{audit_keys.get_object_key(key)}')
+            data = audit_keys.encode_record(key, data)
+            client.put_object(
+                settings.s3_bucket, absolute_path, io.BytesIO(data), len(data),
+                content_type=audit_keys.get_record_content_type(key)
+            )
+        except S3Error as e:
+            logger.error(f'Failed storing object in storage: {e}')
 
-class GeneratedStream(io.BytesIO):
-    def __init__(self, generator: Generator[bytes, None, None], *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.generator = generator
-
-    def read(self, size: int = -1):
-        if size < 0:
-            while True:
-                try:
-                    chunk = next(self.generator)
-                except StopIteration:
-                    break
-                else:
-                    self.write(chunk)
+            return False
         else:
-            total_written_size = 0
+            logger.debug(f'Stored object in storage: {key}')
+    else:
+        logger.debug(f'S3 is not configured, not storing object in storage: {key}')
 
-            while total_written_size < size:
-                try:
-                    chunk = next(self.generator)
-                except StopIteration:
-                    break
-                else:
-                    self.write(chunk)
-                    total_written_size += len(chunk)
+    return True
 
-        self.seek(0)
 
-        if chunk := super().read(size):
-            pos = self.tell()
+def get_audit_executor() -> ThreadPoolExecutor:
+    global _audit_executor
 
-            buf = self.getbuffer()
-            unread_data_size = len(buf) - pos
+    if _audit_executor is None:
+        with _audit_executor_lock:
+            if _audit_executor is None:
+                _audit_executor = ThreadPoolExecutor(
+                    max_workers=audit_settings.audit_max_in_flight,
+                    thread_name_prefix='audit-writer'
+                )
 
-            if unread_data_size > 0:
-                buf[:unread_data_size] = buf[pos:pos+unread_data_size]
+    return _audit_executor
 
-            del buf
 
-            self.seek(0)
-            self.truncate(unread_data_size)
+def _get_in_flight_limit(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    try:
+        return _in_flight_limits[loop]
+    except KeyError:
+        limit = _in_flight_limits[loop] = asyncio.Semaphore(audit_settings.audit_max_in_flight)
 
-        return chunk
+        return limit
 
-    def readable(self):
-        return True
 
+async def write_audit_data(settings: S3Settings, key: str, data: bytes) -> bool:
+    """
+    Stores audit data without blocking the event loop: the upload runs in a dedicated thread pool and the number of
+    uploads in flight per loop is capped by `audit_max_in_flight`.
+    """
+    loop = asyncio.get_running_loop()
 
-def generate_archive(objects: Iterable[tuple[str, datetime, bytes]],
-                     chunk_size: int = 4096) -> Generator[bytes, None, None]:
-    buffer = io.BytesIO()
+    async with _get_in_flight_limit(loop):
+        return await loop.run_in_executor(get_audit_executor(), write_audit_data_sync, settings, key, data)
 
-    with tarfile.open(fileobj=buffer, mode='w') as archive:
-        for name, last_modified, content in objects:
-            logger.info(f'Adding {name} to archive')
-            info = tarfile.TarInfo(name)
-            info.size = len(content)
-            info.mtime = last_modified.timestamp()
-            archive.addfile(info, io.BytesIO(content))
 
-            buffer.seek(0)
+def write_audit_batch_sync(settings: S3Settings, records: list[tuple[str, bytes]]) -> bool:
+    result = True
 
-            while True:
-                chunk = buffer.read(chunk_size)
+    for date_path, day_records in audit_segments.group_by_date_path(records).items():
+        segment = audit_segments.encode_segment(
+            (key, audit_keys.encode_record(key, data)) for key, data in day_records
+        )
+        segment_key = audit_segments.make_segment_key(date_path)
+        result = write_audit_data_sync(settings, segment_key, segment) and result
 
-                if not chunk:
-                    break
+    return result
 
-                yield chunk
 
-            buffer.seek(0)
-            buffer.truncate(0)
+async def write_audit_batch(settings: S3Settings, records: list[tuple[str, bytes]]) -> bool:
+    """
+    Stores a batch of audit records as one framed segment object per day, see `audit_segments`.
+    """
+    loop = asyncio.get_running_loop()
 
+    async with _get_in_flight_limit(loop):
+        return await loop.run_in_executor(get_audit_executor(), write_audit_batch_sync, settings, records)
 
-def generate_bzip2(chunks: Generator[bytes, None, None]) -> Generator[bytes, None, None]:
-    compressor = BZ2Compressor()
 
-    for chunk in chunks:
-        if compressed_chunk := compressor.compress(chunk):
-            yield compressed_chunk
+class OverflowPolicy(StrEnum):
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    SPILL = 'spill'
 
-    if compressed_chunk := compressor.flush():
-        yield compressed_chunk
 
+@dataclass
+class AuditSinkStats:
+    enqueued: int = 0
+    written: int = 0
+    failed: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    max_depth: int = 0
 
-def write_audit_data_sync(settings: S3Settings, key: str, data: bytes):
-    if settings.s3_secret_access_key:
+
+class AuditSink:
+    """
+    Bounded audit queue drained by a fixed number of worker tasks on the event loop it is first used on.
+
+    When the queue is full, the overflow policy decides what happens to a new record: `block` waits for a free slot,
+    `drop_oldest` discards the oldest queued record and `spill` hands the new record to the `spill` callable. Records
+    that fail to be written are handed to `spill` as well when it is set, e.g. an `audit_spool.AuditSpool`. A spill
+    returning `False` (a spool over its disk budget) or raising loses the record, counted as `dropped` on overflow and
+    as `failed` after a failed write.
+
+    With `batch_max_records` above 1 each worker gathers up to that many records, `batch_max_bytes` of data or
+    `batch_max_delay` seconds worth of records and stores them as a single segment object.
+    """
+    def __init__(self, settings: S3Settings = s3_settings, max_size: int | None = None, workers: int | None = None,
+                 overflow: OverflowPolicy | str | None = None,
+                 spill: Callable[[str, bytes], bool | None] | None = None, batch_max_records: int | None = None,
+                 batch_max_bytes: int | None = None, batch_max_delay: float | None = None):
+        self.settings = settings
+        self.max_size = max_size or audit_settings.audit_sink_max_size
+        self.workers = workers or audit_settings.audit_sink_workers
+        self.overflow = OverflowPolicy(overflow or audit_settings.audit_sink_overflow)
+        self.spill = spill
+        self.batch_max_records = batch_max_records or audit_settings.audit_batch_max_records
+        self.batch_max_bytes = batch_max_bytes or audit_settings.audit_batch_max_bytes
+        self.batch_max_delay = audit_settings.audit_batch_max_delay if batch_max_delay is None else batch_max_delay
+        self.stats = AuditSinkStats()
+        self._queue: asyncio.Queue[tuple[str, bytes]] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._worker_tasks: set[asyncio.Task] = set()
+        self._pending_puts: set[asyncio.Task] = set()
+        self._closed = False
+
+        if self.overflow == OverflowPolicy.SPILL and spill is None:
+            raise ValueError('spill must be set when overflow policy is spill')
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._pending_puts)
+
+    def _get_queue(self) -> asyncio.Queue[tuple[str, bytes]]:
+        if self._closed:
+            raise RuntimeError('Audit sink is closed')
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_size)
+            self._loop = asyncio.get_running_loop()
+
+            worker = self._batch_worker if self.batch_max_records > 1 else self._worker
+
+            for i in range(self.workers):
+                self._worker_tasks.add(asyncio.create_task(worker(), name=f'audit-sink-worker-{i}'))
+
+        return self._queue
+
+    async def _write_record(self, key: str, data: bytes) -> bool:
+        return await write_audit_data(self.settings, key, data)
+
+    async def _write_batch(self, records: list[tuple[str, bytes]]) -> bool:
+        return await write_audit_batch(self.settings, records)
+
+    async def _worker(self):
+        queue = self._queue
+
+        while True:
+            key, data = await queue.get()
+
+            try:
+                written = await self._write_record(key, data)
+            except Exception as e:
+                written = False
+                logger.error(f'Failed writing audit data: {key}', exc_info=e)
+
+            try:
+                if written:
+                    self.stats.written += 1
+                else:
+                    self._write_failed([(key, data)])
+            finally:
+                queue.task_done()
+
+    async def _batch_worker(self):
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await queue.get()]
+            batch_size = len(batch[0][1])
+            deadline = loop.time() + self.batch_max_delay
+
+            while len(batch) < self.batch_max_records and batch_size < self.batch_max_bytes:
+                if queue.empty():
+                    if (timeout := deadline - loop.time()) <= 0:
+                        break
+
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+
+                batch.append(item)
+                batch_size += len(item[1])
+
+            try:
+                written = await self._write_batch(batch)
+            except Exception as e:
+                written = False
+                logger.error(f'Failed writing audit batch of {len(batch)} records', exc_info=e)
+
+            try:
+                if written:
+                    self.stats.written += len(batch)
+                else:
+                    self._write_failed(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _spill(self, key: str, data: bytes) -> bool:
         try:
-            client = ObjectStorage(settings).get_client()
-            absolute_path = object_storage.get_absolute_path(f'audit/{key}')
+            spilled = self.spill(key, data) is not False
+        except Exception as e:
+            logger.error(f'Failed spilling audit data: {key}', exc_info=e)
+
+            return False
+
+        if spilled:
+            self.stats.spilled += 1
+
+        return spilled
+
+    def _write_failed(self, records: list[tuple[str, bytes]]):
+        if self.spill is None:
+            self.stats.failed += len(records)
+
+            return
+
+        for key, data in records:
+            if not self._spill(key, data):
+                self.stats.failed += 1
+
+    def _enqueue(self, queue: asyncio.Queue[tuple[str, bytes]], key: str, data: bytes):
+        queue.put_nowait((key, data))
+        self.stats.enqueued += 1
+        self.stats.max_depth = max(self.stats.max_depth, queue.qsize())
+
+    async def _put_blocking(self, queue: asyncio.Queue[tuple[str, bytes]], key: str, data: bytes):
+        await queue.put((key, data))
+        self.stats.enqueued += 1
+        self.stats.max_depth = max(self.stats.max_depth, queue.qsize())
+
+    def _handle_overflow(self, queue: asyncio.Queue[tuple[str, bytes]], key: str, data: bytes) -> bool:
+        if self.overflow == OverflowPolicy.DROP_OLDEST:
+            dropped_key, _ = queue.get_nowait()
+            queue.task_done()
+            self.stats.dropped += 1
+            logger.warning(f'Audit queue is full, dropped: {dropped_key}')
+            self._enqueue(queue, key, data)
+
+            return True
+        elif self.overflow == OverflowPolicy.SPILL:
+            if not self._spill(key, data):
+                self.stats.dropped += 1
+                logger.warning(f'Audit queue is full and spilling failed, dropped: {key}')
+
+            return True
+
+        return False
+
+    async def put(self, key: str, data: bytes):
+        queue = self._get_queue()
+
+        if not queue.full():
+            self._enqueue(queue, key, data)
+        elif not self._handle_overflow(queue, key, data):
+            await self._put_blocking(queue, key, data)
+
+    def put_nowait(self, key: str, data: bytes):
+        """
+        Enqueues a record from synchronous code running on the sink's loop. Such callers can't be suspended, so with the
+        `block` policy a full queue defers the record to a tracked task that waits for a free slot. At most `max_size`
+        records wait that way, further ones are dropped.
+        """
+        queue = self._get_queue()
+
+        if not queue.full():
+            self._enqueue(queue, key, data)
+        elif not self._handle_overflow(queue, key, data):
+            if len(self._pending_puts) >= self.max_size:
+                self.stats.dropped += 1
+                logger.warning(f'Audit queue is full and {self.max_size} records are waiting, dropped: {key}')
+
+                return
+
+            task = asyncio.create_task(self._put_blocking(queue, key, data))
+            self._pending_puts.add(task)
+            task.add_done_callback(self._pending_puts.discard)
+
+    def submit(self, key: str, data: bytes):
+        """
+        Enqueues a record from any thread: on the sink's loop directly, from other threads through the loop. A sink
+        that was never used needs a running loop, which becomes its loop.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
 
-            client.put_object(settings.s3_bucket, absolute_path, io.BytesIO(data), len(data))
-        except S3Error as e:
-            logger.error(f'Failed storing object in storage: {e}')
+        if running_loop is not None and self._loop in (None, running_loop):
+            self.put_nowait(key, data)
+        elif self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self.put_nowait, key, data)
         else:
-            logger.debug(f'Stored object in storage: {key}')
+            raise RuntimeError('Audit sink has no running event loop, use a ThreadedAuditSink for synchronous callers')
+
+    async def drain(self):
+        # A finished put stays in the set until its done callback runs, so only unfinished ones are awaited
+        while pending := [task for task in self._pending_puts if not task.done()]:
+            await asyncio.wait(pending)
+
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        await self.drain()
+        self._closed = True
+
+        for task in self._worker_tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+
+
+def _set_future(future: asyncio.Future, result, exception: BaseException | None):
+    if future.done():
+        return
+
+    if exception is None:
+        future.set_result(result)
     else:
-        logger.debug(f'S3 is not configured, not storing object in storage: {key}')
+        future.set_exception(exception)
+
+
+class ThreadedAuditSink(AuditSink):
+    """
+    Audit sink running on its own long-lived event loop in a background thread, for synchronous callers that have no
+    loop of their own. Submitting a record only costs a thread-safe enqueue.
 
+    Records are written by `workers` threads of the sink's own rather than the shared writer pool, so the sink still
+    drains from an `atexit` handler, when `concurrent.futures` no longer accepts work. Records submitted after
+    `shutdown()`, e.g. by threads still running at interpreter exit, are written by the submitting thread.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._writes: SimpleQueue[tuple[asyncio.Future, Callable, tuple] | None] = SimpleQueue()
+        # With the `block` policy, records on their way into the queue: submitting threads wait when all are taken
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._threads = [threading.Thread(target=self._loop.run_forever, name='audit-sink', daemon=True)] + [
+            threading.Thread(target=self._run_writer, name=f'audit-sink-writer-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+
+        for thread in self._threads:
+            thread.start()
+
+    def _run_writer(self):
+        while (item := self._writes.get()) is not None:
+            future, fn, args = item
+
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._loop.call_soon_threadsafe(_set_future, future, None, e)
+            else:
+                self._loop.call_soon_threadsafe(_set_future, future, result, None)
+
+    async def _call_writer(self, fn: Callable, *args):
+        future = self._loop.create_future()
+        self._writes.put((future, fn, args))
+
+        return await future
+
+    async def _write_record(self, key: str, data: bytes) -> bool:
+        return await self._call_writer(write_audit_data_sync, self.settings, key, data)
+
+    async def _write_batch(self, records: list[tuple[str, bytes]]) -> bool:
+        return await self._call_writer(write_audit_batch_sync, self.settings, records)
+
+    def _write_late(self, key: str, data: bytes):
+        try:
+            written = write_audit_data_sync(self.settings, key, data)
+        except Exception as e:
+            written = False
+            logger.error(f'Failed writing audit data: {key}', exc_info=e)
 
-async def write_audit_data(settings: S3Settings, key: str, data: bytes):
-    write_audit_data_sync(settings, key, data)
+        if written:
+            self.stats.written += 1
+        else:
+            self._write_failed([(key, data)])
 
+    def submit(self, key: str, data: bytes):
+        if self._closed or self._loop.is_closed():
+            self._write_late(key, data)
 
-async def archive_audit_data(root_path: str = 'audit'):
-    now = datetime.now(tz=UTC) - timedelta(days=1)
-    year = now.year
-    month = now.month
-    day = now.day
-    bucket_name = s3_settings.s3_bucket
-    date_path = object_storage.get_absolute_path(f'{root_path}/{year}/{month:02}/{day:02}')
+            return
 
-    if objects := object_storage.get_objects(bucket_name, date_path, recursive=True):
-        logger.info(f'Compacting files in: {date_path}')
+        if self.overflow != OverflowPolicy.BLOCK:
+            callback = self.put_nowait
+        else:
+            callback = self._put_slot
+            self._slots.acquire()
 
-        generator = generate_archive(objects, chunk_size=5*1024*1024)
-        bzip2_generator = generate_bzip2(generator)
-        archive_stream = GeneratedStream(bzip2_generator)
+        try:
+            self._loop.call_soon_threadsafe(callback, key, data)
+        except RuntimeError:
+            # The loop was closed meanwhile
+            if callback == self._put_slot:
+                self._slots.release()
 
-        archive_path = object_storage.get_absolute_path(f'audit/.archive/{year}_{month:02}_{day:02}.tar.bz2')
-        object_storage.put_object(bucket_name, archive_path, archive_stream, -1, part_size=5*1024*1024)
+            self._write_late(key, data)
 
-        if errors := object_storage.remove_objects(bucket_name, date_path):
-            for error in errors:
-                logger.error(f'Failed to delete object in {bucket_name=}: {error}')
+    def _put_slot(self, key: str, data: bytes):
+        queue = self._get_queue()
+
+        if not queue.full():
+            self._enqueue(queue, key, data)
+            self._slots.release()
+
+            return
+
+        task = asyncio.create_task(self._put_blocking(queue, key, data))
+        self._pending_puts.add(task)
+        task.add_done_callback(self._pending_puts.discard)
+        task.add_done_callback(lambda _: self._slots.release())
+
+    def shutdown(self, timeout: float | None = None):
+        if self._loop.is_closed():
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result(timeout)
+        finally:
+            for _ in range(self.workers):
+                self._writes.put(None)
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+            for thread in self._threads:
+                thread.join(timeout)
+
+            if not self._threads[0].is_alive():
+                self._loop.close()
+
+
+def get_loop_audit_sink() -> AuditSink:
+    """
+    Default sink of the running loop, created on first use with the `audit_sink_*` settings. Await
+    `close_loop_audit_sink()` before the loop stops (e.g. on application shutdown), records still queued are lost
+    otherwise.
+    """
+    loop = asyncio.get_running_loop()
+
+    try:
+        return _loop_sinks[loop]
+    except KeyError:
+        sink = _loop_sinks[loop] = AuditSink()
+
+        return sink
+
+
+async def close_loop_audit_sink():
+    if (sink := _loop_sinks.pop(asyncio.get_running_loop(), None)) is not None:
+        await sink.close()
+
+
+def get_background_audit_sink() -> ThreadedAuditSink:
+    global _background_sink
+
+    if _background_sink is None:
+        with _background_sink_lock:
+            if _background_sink is None:
+                _background_sink = ThreadedAuditSink()
+                atexit.register(_background_sink.shutdown)
+
+    return _background_sink
+
+
+@dataclass(frozen=True)
+class AuditPolicy:
+    """
+    Decides which envelopes of an operation are stored: a `sample_rate` share of the exchanges (request and response
+    together), only in the listed `directions` (all when empty), faults always unless `audit_faults` is off. Envelopes
+    serialized to more than `max_size` bytes are truncated.
+    """
+    sample_rate: float = 1.0
+    directions: frozenset[str] = field(default_factory=frozenset)
+    audit_faults: bool = True
+    max_size: int | None = None
+
+
+class SerializationMode(StrEnum):
+    COMPACT = 'compact'
+    PRETTY = 'pretty'
+    C14N = 'c14n'
+
+
+def serialize_envelope(envelope, mode: SerializationMode | str = SerializationMode.COMPACT) -> bytes:
+    """
+    `compact` is the cheapest and smallest, `pretty` is easier on the eye, `c14n` (canonical XML) gives identical
+    envelopes identical bytes, which helps deduplication.
+    """
+    match SerializationMode(mode):
+        case SerializationMode.COMPACT:
+            return etree.tostring(envelope, encoding='UTF-8')
+        case SerializationMode.PRETTY:
+            return etree.tostring(envelope, encoding='UTF-8', pretty_print=True)
+        case SerializationMode.C14N:
+            return etree.tostring(envelope, method='c14n')
+
+
+def is_fault(envelope) -> bool:
+    return envelope.find('{*}Body/{*}Fault') is not None
+
+
+TRUNCATED_MARKER = b'\n<!-- audit: truncated, original size %d bytes -->\n'
 
 
 class ZeepAuditPlugin(Plugin):
-    def __init__(self, audit_name: str = 'zeep'):
+    """
+    Stores SOAP envelopes in object storage through `sink`: an `AuditSink`, `ThreadedAuditSink` or
+    `audit_spool.AuditSpool`. Without one, envelopes go to the running loop's sink (`get_loop_audit_sink()`) or, in
+    threads without a loop, to the background sink. A plain `AuditSink` is fed from other threads through its loop.
+    Auditing never fails the SOAP call: envelopes a sink refuses (e.g. a plain `AuditSink` without a running loop) are
+    logged and counted in `failed`.
+
+    `policies` maps operation names to an `AuditPolicy`, operations not listed use `default_policy`. The policy is
+    applied before the envelope is serialized, so skipped envelopes cost a random number and a dictionary lookup.
+
+    Envelopes are serialized on the request thread, as zeep may still change the tree once plugins return (WS-Security
+    signs the egress envelope). With a `record_codec` (`gzip` or `zstd`) they are compressed by the writer instead.
+    """
+    def __init__(self, audit_name: str = 'zeep', sink: 'AuditSink | ThreadedAuditSink | AuditSpool | None' = None,
+                 policies: dict[str, AuditPolicy] | None = None, default_policy: AuditPolicy = AuditPolicy(),
+                 serialization: SerializationMode | str | None = None, record_codec: str | None = None):
         super().__init__()
         self.audit_name = audit_name
+        self.sink = sink
+        self.serialization = SerializationMode(serialization or audit_settings.audit_serialization)
+        self.record_suffix = audit_keys.get_record_suffix(record_codec or audit_settings.audit_record_codec)
+        self.policies = policies or {}
+        self.default_policy = default_policy
+        self.skipped = 0
+        self.failed = 0
+
+    def get_policy(self, operation: AbstractOperation) -> AuditPolicy:
+        return self.policies.get(operation.name, self.default_policy)
+
+    def is_sampled(self, policy: AuditPolicy, operation: AbstractOperation, direction: str) -> bool:
+        """
+        Samples whole exchanges: the draw made on egress is kept in a context variable, so the ingress of the same call
+        (same thread, or same task with an async transport) reuses it.
+        """
+        if policy.sample_rate >= 1.0:
+            return True
+
+        exchange = (id(self), operation.name)
+
+        if direction == 'ingress' and (sample := _exchange_sample.get()) is not None and sample[:2] == exchange:
+            _exchange_sample.set(None)
+
+            return sample[2]
+
+        sampled = random.random() < policy.sample_rate
+
+        if direction == 'egress':
+            _exchange_sample.set((*exchange, sampled))
+
+        return sampled
+
+    def should_audit(self, policy: AuditPolicy, envelope, operation: AbstractOperation, direction: str) -> bool:
+        if (not policy.directions or direction in policy.directions) and self.is_sampled(policy, operation, direction):
+            return True
+
+        return policy.audit_faults and direction == 'ingress' and is_fault(envelope)
 
     def store_audit_in_s3(self, envelope, operation: AbstractOperation, direction: str):
-        xml = etree.tostring(envelope, encoding='UTF-8', pretty_print=True)
-        now = datetime.now(tz=UTC)
-        date_path = now.strftime('%Y/%m/%d')
-        timestamp = now.strftime('%H%M%S')
-        path = f'{date_path}/{self.audit_name}/{operation.name}/{timestamp}_{str(uuid4())[-12:]}_{direction}.xml'
-        coro = write_audit_data(s3_settings, path, xml)
+        policy = self.get_policy(operation)
 
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
+        if not self.should_audit(policy, envelope, operation, direction):
+            self.skipped += 1
 
-        if loop and loop.is_running():
-            loop.create_task(coro)
-        else:
-            asyncio.run(coro)
+            return
+
+        xml = serialize_envelope(envelope, self.serialization)
+
+        if policy.max_size is not None and len(xml) > policy.max_size:
+            xml = xml[:policy.max_size] + TRUNCATED_MARKER % len(xml)
+
+        date_path, key_id = audit_keys.generate_key_id()
+        path = f'{date_path}/{self.audit_name}/{operation.name}/{key_id}_{direction}.xml{self.record_suffix}'
+
+        if (sink := self.sink) is None:
+            try:
+                sink = get_loop_audit_sink()
+            except RuntimeError:
+                sink = get_background_audit_sink()
+
+        try:
+            sink.submit(path, xml)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f'Failed submitting audit data: {path}', exc_info=e)
 
     def ingress(self, envelope, http_headers, operation: AbstractOperation):
         self.store_audit_in_s3(envelope, operation, 'ingress')
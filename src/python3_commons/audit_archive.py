@@ -0,0 +1,775 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import tarfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, UTC
+from typing import BinaryIO, Callable, Generator, Iterable
+
+from minio import S3Error
+
+from python3_commons import audit_keys, object_storage
+from python3_commons.compression import (
+    CODECS, Codec, compress_blocks, generate_compressed, generate_decompressed, get_codec
+)
+from python3_commons.conf import audit_settings, s3_settings
+from python3_commons.helpers import date_range
+from python3_commons.serializers.msgspec import deserialize_msgpack, serialize_msgpack
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_INDEX_VERSION = 1
+ARCHIVE_PART_SIZE = 5 * 1024 * 1024
+RESTORE_MEMBER_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class ArchiveFrame:
+    offset: int
+    size: int
+    compressed_offset: int = 0
+    compressed_size: int = 0
+
+
+@dataclass
+class ArchiveMember:
+    name: str
+    frame: int
+    offset: int
+    size: int
+    mtime: float
+    checksum: str
+
+
+@dataclass
+class ArchiveIndex:
+    archive: str
+    codec: str
+    frames: list[ArchiveFrame] = field(default_factory=list)
+    members: list[ArchiveMember] = field(default_factory=list)
+    version: int = ARCHIVE_INDEX_VERSION
+
+    def find_member(self, name: str) -> ArchiveMember | None:
+        for member in self.members:
+            if member.name == name:
+                return member
+
+        return None
+
+    def get_frame_range(self, member: ArchiveMember) -> tuple[int, int]:
+        first = last = member.frame
+        end = member.offset + member.size
+
+        while last + 1 < len(self.frames) and self.frames[last + 1].offset < end:
+            last += 1
+
+        return first, last
+
+    def group_members(self, members: Iterable[ArchiveMember],
+                      max_compressed_size: int = 16 * 1024 * 1024) -> list[list[ArchiveMember]]:
+        """
+        Groups members (in archive order) whose frames are shared or adjacent, so each group is one ranged GET.
+        """
+        groups = []
+        group = []
+        group_first = group_last = 0
+
+        for member in members:
+            first, last = self.get_frame_range(member)
+            compressed_end = self.frames[last].compressed_offset + self.frames[last].compressed_size
+
+            if (group and first <= group_last + 1
+                    and compressed_end - self.frames[group_first].compressed_offset <= max_compressed_size):
+                group.append(member)
+                group_last = max(group_last, last)
+            else:
+                if group:
+                    groups.append(group)
+
+                group = [member]
+                group_first, group_last = first, last
+
+        if group:
+            groups.append(group)
+
+        return groups
+
+
+class GeneratedStream(io.RawIOBase):
+    """
+    Read-only stream over a generator of byte chunks. Chunks are kept as memoryviews and handed out without being
+    re-copied, so they must not be mutated after being yielded.
+    """
+    def __init__(self, generator: Iterable[bytes]):
+        super().__init__()
+        self.generator = iter(generator)
+        self._chunks: deque[memoryview] = deque()
+        self._buffered_size = 0
+
+    def _fill(self, size: int):
+        while size < 0 or self._buffered_size < size:
+            try:
+                chunk = next(self.generator)
+            except StopIteration:
+                break
+
+            if chunk:
+                view = memoryview(chunk).cast('B')
+                self._chunks.append(view)
+                self._buffered_size += len(view)
+
+    def _take(self, size: int) -> list[memoryview]:
+        views = []
+
+        while size > 0 and self._chunks:
+            chunk = self._chunks[0]
+
+            if len(chunk) <= size:
+                views.append(self._chunks.popleft())
+            else:
+                views.append(chunk[:size])
+                self._chunks[0] = chunk[size:]
+
+            size -= len(views[-1])
+            self._buffered_size -= len(views[-1])
+
+        return views
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+
+        if size < 0 or size > self._buffered_size:
+            size = self._buffered_size
+
+        views = self._take(size)
+
+        if len(views) == 1:
+            view = views[0]
+
+            if isinstance(view.obj, bytes) and len(view.obj) == len(view):
+                return view.obj
+
+            return view.tobytes()
+
+        return b''.join(views)
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast('B')
+        self._fill(len(target))
+        offset = 0
+
+        for view in self._take(len(target)):
+            target[offset:offset + len(view)] = view
+            offset += len(view)
+
+        return offset
+
+    def readable(self):
+        return True
+
+
+def _tar_header(name: str, last_modified: datetime, size: int) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = last_modified.timestamp()
+
+    return info.tobuf(tarfile.DEFAULT_FORMAT, tarfile.ENCODING, 'surrogateescape')
+
+
+def _tar_padding(size: int) -> bytes:
+    if remainder := size % tarfile.BLOCKSIZE:
+        return tarfile.NUL * (tarfile.BLOCKSIZE - remainder)
+
+    return b''
+
+
+def _tar_trailer(offset: int) -> bytes:
+    offset += 2 * tarfile.BLOCKSIZE
+
+    if remainder := offset % tarfile.RECORDSIZE:
+        return tarfile.NUL * (2 * tarfile.BLOCKSIZE + tarfile.RECORDSIZE - remainder)
+
+    return tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def generate_archive(objects: Iterable[tuple[str, datetime, bytes]],
+                     chunk_size: int | None = None) -> Generator[bytes | memoryview, None, None]:
+    """
+    Builds a tar archive (byte-identical to `tarfile` output) without copying member content: yields each header,
+    memoryviews of the content, at most `chunk_size` bytes each when given, and the padding.
+    """
+    offset = 0
+
+    for name, last_modified, content in objects:
+        logger.info(f'Adding {name} to archive')
+        header = _tar_header(name, last_modified, len(content))
+
+        yield header
+
+        view = memoryview(content)
+
+        if chunk_size is None:
+            if view:
+                yield view
+        else:
+            for chunk_offset in range(0, len(view), chunk_size):
+                yield view[chunk_offset:chunk_offset + chunk_size]
+
+        if padding := _tar_padding(len(content)):
+            yield padding
+
+        offset += len(header) + len(content) + len(padding)
+
+    yield _tar_trailer(offset)
+
+
+def generate_archive_stream(objects: Iterable[tuple[str, datetime, int, BinaryIO]],
+                            chunk_size: int = 1024 * 1024) -> Generator[bytes, None, None]:
+    """
+    Builds the same tar stream as `generate_archive`, but copies each member from its stream in chunks of at most
+    `chunk_size` bytes, so memory use doesn't depend on object sizes.
+    """
+    offset = 0
+
+    for name, last_modified, size, stream in objects:
+        logger.info(f'Adding {name} to archive')
+        header = _tar_header(name, last_modified, size)
+        offset += len(header)
+
+        yield header
+
+        remaining = size
+
+        while remaining > 0:
+            if not (chunk := stream.read(min(chunk_size, remaining))):
+                raise OSError(f'Unexpected end of data for {name}: {remaining} bytes missing')
+
+            remaining -= len(chunk)
+
+            yield chunk
+
+        if padding := _tar_padding(size):
+            yield padding
+
+        offset += size + len(padding)
+
+    yield _tar_trailer(offset)
+
+
+def generate_bzip2(chunks: Generator[bytes, None, None]) -> Generator[bytes, None, None]:
+    return generate_compressed(chunks, 'bz2')
+
+
+def generate_archive_frames(objects: Iterable[tuple[str, datetime, int, BinaryIO]], index: ArchiveIndex,
+                            frame_size: int = 4 * 1024 * 1024,
+                            chunk_size: int = 1024 * 1024) -> Generator[bytes, None, None]:
+    """
+    Builds the same tar stream as `generate_archive_stream`, cut into frames of about `frame_size` bytes to be
+    compressed independently. Frames end on member boundaries unless a member is bigger than `frame_size` itself.
+    Frame and member positions are recorded in `index`.
+    """
+    frame = bytearray()
+    frame_offset = 0
+
+    for name, last_modified, size, stream in objects:
+        logger.info(f'Adding {name} to archive')
+        frame += _tar_header(name, last_modified, size)
+        member = ArchiveMember(name, len(index.frames), frame_offset + len(frame), size, last_modified.timestamp(), '')
+        checksum = hashlib.sha256()
+        remaining = size
+
+        while remaining > 0:
+            if not (chunk := stream.read(min(chunk_size, remaining))):
+                raise OSError(f'Unexpected end of data for {name}: {remaining} bytes missing')
+
+            remaining -= len(chunk)
+            checksum.update(chunk)
+            frame += chunk
+
+            if size > frame_size and len(frame) >= frame_size:
+                index.frames.append(ArchiveFrame(frame_offset, len(frame)))
+                frame_offset += len(frame)
+
+                yield bytes(frame)
+
+                frame.clear()
+
+        frame += _tar_padding(size)
+        member.checksum = checksum.hexdigest()
+        index.members.append(member)
+
+        if len(frame) >= frame_size:
+            index.frames.append(ArchiveFrame(frame_offset, len(frame)))
+            frame_offset += len(frame)
+
+            yield bytes(frame)
+
+            frame.clear()
+
+    frame += _tar_trailer(frame_offset + len(frame))
+    index.frames.append(ArchiveFrame(frame_offset, len(frame)))
+
+    yield bytes(frame)
+
+
+def generate_indexed_archive(objects: Iterable[tuple[str, datetime, int, BinaryIO]], index: ArchiveIndex,
+                             level: int | None = None, frame_size: int = 4 * 1024 * 1024,
+                             workers: int = 1) -> Generator[bytes, None, None]:
+    """
+    Compressed tar archive made of independently decodable frames, readable by regular tools as a multi-stream file.
+    Compressed frame positions are filled into `index` as frames are yielded.
+    """
+    frames = generate_archive_frames(objects, index, frame_size)
+    compressed_offset = 0
+
+    for i, compressed_frame in enumerate(compress_blocks(frames, index.codec, level, workers)):
+        index.frames[i].compressed_offset = compressed_offset
+        index.frames[i].compressed_size = len(compressed_frame)
+        compressed_offset += len(compressed_frame)
+
+        yield compressed_frame
+
+
+def _get_archive_name(day: date, generation: int) -> str:
+    return f'{day:%Y_%m_%d}.{generation}' if generation else f'{day:%Y_%m_%d}'
+
+
+def get_archive_path(day: date, codec: Codec | str, generation: int = 0) -> str:
+    return object_storage.get_absolute_path(
+        f'audit/.archive/{_get_archive_name(day, generation)}.tar{get_codec(codec).extension}'
+    )
+
+
+def get_archive_index_path(day: date, generation: int = 0) -> str:
+    return object_storage.get_absolute_path(f'audit/.archive/{_get_archive_name(day, generation)}.tar.index')
+
+
+def get_archive_index(bucket_name: str, day: date, generation: int = 0) -> ArchiveIndex | None:
+    try:
+        data = object_storage.get_object(bucket_name, get_archive_index_path(day, generation))
+    except S3Error as e:
+        if e.code == 'NoSuchKey':
+            return None
+
+        raise
+
+    return deserialize_msgpack(data, data_type=ArchiveIndex)
+
+
+def get_archive_indexes(bucket_name: str, day: date) -> list[ArchiveIndex]:
+    """
+    Indexes of every archive generation of a day, oldest first. Objects that arrive after a day was archived end up in
+    a further generation (`YYYY_MM_DD.<n>.tar.<ext>`), the day's marker holds the latest generation number.
+    """
+    if (index := get_archive_index(bucket_name, day)) is None:
+        return []
+
+    indexes = [index]
+
+    if marker := get_archive_marker(bucket_name, day):
+        for generation in range(1, marker.get('generation', 0) + 1):
+            if (index := get_archive_index(bucket_name, day, generation)) is not None:
+                indexes.append(index)
+
+    return indexes
+
+
+def read_archive_members(bucket_name: str, index: ArchiveIndex,
+                         members: list[ArchiveMember]) -> Generator[tuple[ArchiveMember, bytes], None, None]:
+    """
+    Reads members spanning a contiguous frame range, as grouped by `ArchiveIndex.group_members`, with a single
+    ranged GET.
+    """
+    frame_ranges = [index.get_frame_range(member) for member in members]
+    first_frame = index.frames[min(first for first, _ in frame_ranges)]
+    last_frame = index.frames[max(last for _, last in frame_ranges)]
+    compressed_data = object_storage.get_object(
+        bucket_name, index.archive, offset=first_frame.compressed_offset,
+        length=last_frame.compressed_offset + last_frame.compressed_size - first_frame.compressed_offset
+    )
+    data = b''.join(generate_decompressed((compressed_data, ), index.codec))
+
+    for member in members:
+        start = member.offset - first_frame.offset
+        content = data[start:start + member.size]
+
+        if hashlib.sha256(content).hexdigest() != member.checksum:
+            raise ValueError(f'Checksum mismatch for archived {member.name} in {index.archive}')
+
+        yield member, content
+
+
+def read_archive_member(bucket_name: str, index: ArchiveIndex, member: ArchiveMember) -> bytes:
+    _, content = next(read_archive_members(bucket_name, index, [member]))
+
+    return content
+
+
+def fetch_archived_audit(key: str, index: ArchiveIndex | None = None) -> bytes | None:
+    """
+    Reads a single audit object, e.g. `2024/05/03/zeep/GetPayment/018f3df334a06b0f1e1c4a2d9e8f7a61_egress.xml`, from
+    its day's archive: a GET for each sidecar index (unless given) and one ranged GET for the frames holding the member.
+    """
+    bucket_name = s3_settings.s3_bucket
+
+    if index is None:
+        year, month, day = key.split('/', 3)[:3]
+        indexes = get_archive_indexes(bucket_name, date(int(year), int(month), int(day)))
+    else:
+        indexes = [index]
+
+    for index in indexes:
+        for object_key in dict.fromkeys((audit_keys.get_object_key(key), key)):
+            if member := index.find_member(object_storage.get_absolute_path(f'audit/{object_key}')):
+                return read_archive_member(bucket_name, index, member)
+
+    return None
+
+
+@dataclass
+class ArchiveDayResult:
+    day: date
+    status: str
+    objects: int = 0
+    bytes: int = 0
+
+
+def get_archive_marker_path(day: date) -> str:
+    return object_storage.get_absolute_path(f'audit/.archive/{day:%Y_%m_%d}.done')
+
+
+def get_archive_marker(bucket_name: str, day: date) -> dict | None:
+    try:
+        return json.loads(object_storage.get_object(bucket_name, get_archive_marker_path(day)))
+    except S3Error as e:
+        if e.code == 'NoSuchKey':
+            return None
+
+        raise
+
+
+def put_archive_marker(bucket_name: str, day: date, marker: dict):
+    marker_data = json.dumps(marker).encode()
+    object_storage.put_object(
+        bucket_name, get_archive_marker_path(day), io.BytesIO(marker_data), len(marker_data),
+        content_type='application/json'
+    )
+
+
+def delete_archived_objects(bucket_name: str, day: date, index: ArchiveIndex, marker: dict):
+    """
+    Deletes exactly the objects stored in the archive and records the outcome in the day's marker.
+    """
+    stats = object_storage.delete_objects(
+        bucket_name, (member.name for member in index.members), workers=audit_settings.audit_archive_delete_workers
+    )
+    logger.info(
+        f'Deleted {stats.deleted} archived objects for {day} in {stats.elapsed:.1f}s, {stats.failed} failed'
+    )
+    marker.update(deleted=stats.failed == 0, deleted_objects=stats.deleted, failed_objects=stats.failed)
+    put_archive_marker(bucket_name, day, marker)
+
+
+def archive_audit_day(day: date, root_path: str = 'audit', codec: Codec | str | None = None, level: int | None = None,
+                      compression_workers: int | None = None, dry_run: bool = False) -> ArchiveDayResult:
+    """
+    Archives one day of audit data. Once the stored archive matches the uploaded size and checksum a completion marker
+    is written and exactly the archived objects are deleted. Objects are archived in event order across operations and
+    key shards, which means the day's listing is held in memory while sorting.
+
+    Later runs on a marked day finish an interrupted deletion and archive objects that arrived since (spool replays,
+    records written around midnight) as a new archive generation, existing archives are never rewritten.
+    """
+    codec = get_codec(codec or audit_settings.audit_archive_codec)
+    level = audit_settings.audit_archive_level if level is None else level
+    compression_workers = compression_workers or audit_settings.audit_archive_compression_workers
+    bucket_name = s3_settings.s3_bucket
+    date_path = object_storage.get_absolute_path(f'{root_path}/{day:%Y/%m/%d}')
+    shard_names = audit_keys.list_shard_names(bucket_name, object_storage.get_absolute_path(f'{root_path}/'))
+    day_prefixes = [
+        object_storage.get_absolute_path(prefix) for prefix in audit_keys.get_day_prefixes(root_path, day, shard_names)
+    ]
+
+    generation = 0
+
+    if (marker := get_archive_marker(bucket_name, day)) is not None:
+        if not marker.get('deleted', True):
+            if dry_run:
+                return ArchiveDayResult(day, 'skipped')
+
+            delete_archived_objects(
+                bucket_name, day, get_archive_index(bucket_name, day, marker.get('generation', 0)), marker
+            )
+
+            if not marker['deleted']:
+                logger.warning(f'Archived objects are not all deleted yet, not archiving further: {date_path}')
+
+                return ArchiveDayResult(day, 'skipped')
+
+        generation = marker.get('generation', 0) + 1
+
+    root_prefix = object_storage.get_absolute_path(f'{root_path}/')
+    listed_objects = object_storage.list_objects_parallel(
+        bucket_name, day_prefixes, workers=audit_settings.audit_archive_workers
+    )
+
+    if dry_run:
+        result = ArchiveDayResult(day, 'dry_run')
+
+        for obj in listed_objects:
+            result.objects += 1
+            result.bytes += obj.size or 0
+
+        if marker is not None and not result.objects:
+            logger.info(f'Already archived: {date_path}')
+
+            return ArchiveDayResult(day, 'skipped')
+
+        logger.info(f'Would archive {result.objects} objects ({result.bytes} bytes) from {date_path}')
+
+        return result
+
+    listed_objects = sorted(
+        listed_objects,
+        key=lambda obj: audit_keys.get_sort_key(audit_keys.get_logical_key(obj.object_name.removeprefix(root_prefix)))
+    )
+
+    if not listed_objects:
+        if marker is not None:
+            logger.info(f'Already archived: {date_path}')
+
+            return ArchiveDayResult(day, 'skipped')
+
+        logger.info(f'Nothing to archive in: {date_path}')
+
+        return ArchiveDayResult(day, 'empty')
+
+    if marker is not None:
+        logger.warning(
+            f'Archiving {len(listed_objects)} objects that arrived after {date_path} was archived, '
+            f'generation {generation}'
+        )
+
+    logger.info(f'Compacting files in: {date_path}')
+
+    stats = object_storage.TransferStats()
+    objects = object_storage.prefetch_object_streams(
+        bucket_name,
+        listed_objects,
+        workers=audit_settings.audit_archive_workers,
+        max_buffer_bytes=audit_settings.audit_archive_buffer_bytes,
+        stats=stats
+    )
+
+    archive_path = get_archive_path(day, codec, generation)
+    index = ArchiveIndex(archive_path, codec.name)
+    generator = generate_indexed_archive(
+        objects, index, level, frame_size=audit_settings.audit_archive_block_size, workers=compression_workers
+    )
+    etag = object_storage.MultipartETag(ARCHIVE_PART_SIZE)
+
+    with object_storage.ObjectWriter(
+        bucket_name, archive_path, part_size=ARCHIVE_PART_SIZE, workers=audit_settings.audit_archive_upload_workers,
+        content_type=codec.content_type
+    ) as writer:
+        for chunk in generator:
+            etag.update(chunk)
+            writer.write(chunk)
+
+    if not object_storage.verify_object(bucket_name, archive_path, etag.size, etag.hexdigest()):
+        raise RuntimeError(f'Stored archive does not match uploaded data, keeping audit objects: {archive_path}')
+
+    index_data = serialize_msgpack(index)
+    object_storage.put_object(
+        bucket_name, get_archive_index_path(day, generation), io.BytesIO(index_data), len(index_data)
+    )
+
+    logger.info(
+        f'Archived {stats.objects} objects ({stats.bytes} bytes) from {date_path} in {stats.elapsed:.1f}s: '
+        f'{stats.objects_per_second:.1f} objects/s, {stats.bytes_per_second / 1024 / 1024:.2f} MiB/s'
+    )
+
+    marker = {
+        'archive': archive_path,
+        'generation': generation,
+        'objects': (marker or {}).get('objects', 0) + stats.objects,
+        'bytes': (marker or {}).get('bytes', 0) + stats.bytes,
+        'archived_at': datetime.now(tz=UTC).isoformat(),
+        'deleted': False
+    }
+    put_archive_marker(bucket_name, day, marker)
+    delete_archived_objects(bucket_name, day, index, marker)
+
+    return ArchiveDayResult(day, 'archived', stats.objects, stats.bytes)
+
+
+async def archive_audit_range(start: date, end: date, workers: int = 4, **kwargs) -> list[ArchiveDayResult]:
+    """
+    Archives every day from `start` to `end` inclusive, up to `workers` days at a time. Accepts the keyword arguments
+    of `archive_audit_day`.
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def archive_day(day: date) -> ArchiveDayResult:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(archive_audit_day, day, **kwargs)
+            except Exception as e:
+                logger.error(f'Failed archiving audit data for {day}', exc_info=e)
+
+                return ArchiveDayResult(day, 'failed')
+
+    return await asyncio.gather(*(archive_day(day) for day in date_range(start, end)))
+
+
+def _restore_member(bucket_name: str, object_name: str, content: bytes) -> int:
+    object_storage.put_object(
+        bucket_name, object_name, io.BytesIO(content), len(content),
+        content_type=audit_keys.get_record_content_type(object_name)
+    )
+
+    return len(content)
+
+
+def _restore_large_member(bucket_name: str, object_name: str, stream: BinaryIO, checksum: str | None, workers: int):
+    """
+    Uploads a member in parts while hashing it, the upload is aborted when the content doesn't match `checksum`.
+    """
+    content_hash = hashlib.sha256()
+
+    with object_storage.ObjectWriter(
+        bucket_name, object_name, workers=workers, content_type=audit_keys.get_record_content_type(object_name)
+    ) as writer:
+        while chunk := stream.read(writer.part_size):
+            content_hash.update(chunk)
+            writer.write(chunk)
+
+        if checksum and content_hash.hexdigest() != checksum:
+            raise ValueError(f'Checksum mismatch for archived {object_name}, aborted its upload')
+
+
+def _restore_archive(bucket_name: str, archive_path: str, codec: Codec, checksums: dict[str, str],
+                     get_object_name: Callable[[str], str], executor: ThreadPoolExecutor, workers: int,
+                     stats: object_storage.TransferStats):
+    pending: deque[Future] = deque()
+
+    logger.info(f'Restoring {archive_path}')
+
+    with object_storage.get_object_stream(bucket_name, archive_path) as response:
+        tar_stream = GeneratedStream(generate_decompressed(response.stream(1024 * 1024), codec))
+
+        with tarfile.open(fileobj=tar_stream, mode='r|') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+
+                object_name = get_object_name(member.name)
+                member_stream = archive.extractfile(member)
+                checksum = checksums.get(member.name)
+
+                if member.size > RESTORE_MEMBER_BUFFER_SIZE:
+                    _restore_large_member(bucket_name, object_name, member_stream, checksum, workers)
+                    stats.add(member.size)
+
+                    continue
+
+                content = member_stream.read()
+
+                if checksum and hashlib.sha256(content).hexdigest() != checksum:
+                    raise ValueError(f'Checksum mismatch for archived {member.name} in {archive_path}')
+
+                pending.append(executor.submit(_restore_member, bucket_name, object_name, content))
+
+                if len(pending) >= workers * 2:
+                    stats.add(pending.popleft().result())
+
+    while pending:
+        stats.add(pending.popleft().result())
+
+
+def _find_unindexed_archive(bucket_name: str, day: date) -> tuple[str, Codec] | None:
+    """
+    Looks for an archive written before archives had an index or a marker, trying each known codec.
+    """
+    for codec in CODECS.values():
+        archive_path = get_archive_path(day, codec)
+
+        try:
+            object_storage.stat_object(bucket_name, archive_path)
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                continue
+
+            raise
+
+        return archive_path, codec
+
+    return None
+
+
+def restore_audit_day(day: date, root_path: str = 'audit', target_root: str | None = None,
+                      workers: int | None = None) -> ArchiveDayResult:
+    """
+    Streams a day's archives back into objects: each archive generation is downloaded, decompressed and parsed as a tar
+    stream on the fly and members are uploaded with up to `workers` concurrent PUTs, so memory is bounded whatever the
+    archive size. Members go back under their original names, or under `target_root` (e.g. a scratch prefix) keyed by
+    their logical audit key. Members are checked against the index checksums when the day has an index; archives
+written before indexes and markers existed are found by their path and restored unchecked.
+
+    The archives and the marker are kept: originals restored under their own names show up twice in queries and the
+    next archive run stores them again as a new generation. Restore under `target_root` to avoid that.
+    """
+    workers = workers or audit_settings.audit_restore_workers
+    bucket_name = s3_settings.s3_bucket
+    root_prefix = object_storage.get_absolute_path(f'{root_path}/')
+
+    if indexes := get_archive_indexes(bucket_name, day):
+        archives = [
+            (index.archive, get_codec(index.codec), {member.name: member.checksum for member in index.members})
+            for index in indexes
+        ]
+    elif (marker := get_archive_marker(bucket_name, day)) is not None:
+        archive_path = marker['archive']
+        codec = next(codec for codec in CODECS.values() if archive_path.endswith(f'.tar{codec.extension}'))
+        archives = [(archive_path, codec, {})]
+    elif (baseline := _find_unindexed_archive(bucket_name, day)) is not None:
+        archives = [(*baseline, {})]
+    else:
+        logger.info(f'No archive to restore for {day}')
+
+        return ArchiveDayResult(day, 'missing')
+
+    def get_object_name(member_name: str) -> str:
+        if target_root is None:
+            return member_name
+
+        logical_key = audit_keys.get_logical_key(member_name.removeprefix(root_prefix))
+
+        return object_storage.get_absolute_path(f'{target_root}/{logical_key}')
+
+    stats = object_storage.TransferStats()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audit-restore') as executor:
+        for archive_path, codec, checksums in archives:
+            _restore_archive(bucket_name, archive_path, codec, checksums, get_object_name, executor, workers, stats)
+
+    logger.info(
+        f'Restored {stats.objects} objects ({stats.bytes} bytes) of {day} in {stats.elapsed:.1f}s: '
+        f'{stats.objects_per_second:.1f} objects/s, {stats.bytes_per_second / 1024 / 1024:.2f} MiB/s'
+    )
+
+    return ArchiveDayResult(day, 'restored', stats.objects, stats.bytes)
+
+
+async def archive_audit_data(root_path: str = 'audit', codec: Codec | str | None = None, level: int | None = None,
+                             compression_workers: int | None = None):
+    day = (datetime.now(tz=UTC) - timedelta(days=1)).date()
+
+    await asyncio.to_thread(archive_audit_day, day, root_path, codec, level, compression_workers)
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta, UTC
+
+from python3_commons.audit_archive import archive_audit_range, restore_audit_day
+from python3_commons.compression import CODECS
+from python3_commons.conf import audit_settings, settings
+from python3_commons.helpers import date_from_string, date_range
+
+logger = logging.getLogger(__name__)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    yesterday = (datetime.now(tz=UTC) - timedelta(days=1)).date()
+    parser = argparse.ArgumentParser(prog='python3-commons-audit', description='Audit data maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    archive_parser = subparsers.add_parser('archive', help='Archive audit data for a range of days')
+    archive_parser.add_argument('--start', type=date_from_string, default=yesterday,
+                                help='First day to archive, YYYY-MM-DD or DD.MM.YYYY (default: yesterday)')
+    archive_parser.add_argument('--end', type=date_from_string, default=None,
+                                help='Last day to archive, inclusive (default: start)')
+    archive_parser.add_argument('--codec', choices=tuple(CODECS), default=audit_settings.audit_archive_codec)
+    archive_parser.add_argument('--level', type=int, default=audit_settings.audit_archive_level)
+    archive_parser.add_argument('--workers', type=int, default=4, help='Days archived concurrently')
+    archive_parser.add_argument('--compression-workers', type=int,
+                                default=audit_settings.audit_archive_compression_workers,
+                                help='Processes compressing each archive')
+    archive_parser.add_argument('--root-path', default='audit')
+    archive_parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    restore_parser = subparsers.add_parser('restore', help='Restore archived audit data back into objects')
+    restore_parser.add_argument('--start', type=date_from_string, required=True,
+                                help='First day to restore, YYYY-MM-DD or DD.MM.YYYY')
+    restore_parser.add_argument('--end', type=date_from_string, default=None,
+                                help='Last day to restore, inclusive (default: start)')
+    restore_parser.add_argument('--target-root', default=None,
+                                help='Restore under this prefix instead of the original keys')
+    restore_parser.add_argument('--workers', type=int, default=audit_settings.audit_restore_workers,
+                                help='Concurrent uploads')
+    restore_parser.add_argument('--root-path', default='audit')
+
+    return parser
+
+
+def archive(args: argparse.Namespace) -> int:
+    results = asyncio.run(archive_audit_range(
+        args.start, args.end or args.start, args.workers, root_path=args.root_path, codec=args.codec,
+        level=args.level, compression_workers=args.compression_workers, dry_run=args.dry_run
+    ))
+
+    for result in results:
+        logger.info(f'{result.day}: {result.status}, {result.objects} objects, {result.bytes} bytes')
+
+    return 1 if any(result.status == 'failed' for result in results) else 0
+
+
+def restore(args: argparse.Namespace) -> int:
+    failed = False
+
+    for day in date_range(args.start, args.end or args.start):
+        try:
+            result = restore_audit_day(day, args.root_path, args.target_root, args.workers)
+        except Exception as e:
+            logger.error(f'Failed restoring audit data for {day}', exc_info=e)
+            failed = True
+        else:
+            logger.info(f'{result.day}: {result.status}, {result.objects} objects, {result.bytes} bytes')
+
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(level=settings.logging_level, format=settings.logging_format)
+    args = get_parser().parse_args(argv)
+
+    if args.command == 'archive':
+        return archive(args)
+
+    if args.command == 'restore':
+        return restore(args)
+
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
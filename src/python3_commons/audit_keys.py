@@ -0,0 +1,230 @@
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, UTC
+from typing import Iterable
+
+from python3_commons import object_storage
+from python3_commons.compression import CODECS, Codec, compress, decompress, get_codec
+from python3_commons.conf import audit_settings
+
+logger = logging.getLogger(__name__)
+
+MAX_SHARDS = 256
+RECORD_CODECS = ('gzip', 'zstd')
+KEY_ID_LENGTH = 32
+
+_SHARD_RE = re.compile(r'^[0-9a-f]{1,2}/(?=\d{4}/)')
+_SHARD_NAME_RE = re.compile(r'[0-9a-f]{1,2}')
+
+
+@dataclass
+class AuditKey:
+    key: str
+    name: str
+    operation: str
+    direction: str
+    timestamp: datetime
+
+
+class KeyIdGenerator:
+    """
+    Time-ordered record ids in the spirit of ULID: 48 bits of milliseconds since the epoch followed by 80 bits that are
+    random for the first id of a millisecond and incremented for the following ones, hex encoded. Ids sort in the
+    order they were generated, also within a millisecond and when the clock steps back.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        self._day_start_ms = self._day_end_ms = 0
+        self._date_path = ''
+
+    def generate(self) -> tuple[str, str]:
+        """
+        Returns the `YYYY/MM/DD` date path of the id and the id itself.
+        """
+        ms = time.time_ns() // 1_000_000
+
+        with self._lock:
+            if ms > self._last_ms:
+                self._last_ms = ms
+                # The top bit is left clear, so increments never overflow into the timestamp
+                self._sequence = random.getrandbits(79)
+            else:
+                ms = self._last_ms
+                self._sequence += 1
+
+            sequence = self._sequence
+
+            if not self._day_start_ms <= ms < self._day_end_ms:
+                self._day_start_ms = ms - ms % 86_400_000
+                self._day_end_ms = self._day_start_ms + 86_400_000
+                self._date_path = time.strftime('%Y/%m/%d', time.gmtime(ms // 1000))
+
+            date_path = self._date_path
+
+        return date_path, f'{ms << 80 | sequence:032x}'
+
+
+_key_id_generator = KeyIdGenerator()
+
+
+def generate_key_id() -> tuple[str, str]:
+    return _key_id_generator.generate()
+
+
+def get_key_time(key: str) -> datetime | None:
+    """
+    Event time of an audit or segment key: millisecond precise for time-ordered ids, to the second (microsecond for
+    segments) for the older `HHMMSS` file names.
+    """
+    parts = key.split('/')
+
+    if len(parts) < 4:
+        return None
+
+    time_part = parts[-1].split('.', 1)[0].split('_', 1)[0]
+
+    try:
+        if len(time_part) == KEY_ID_LENGTH:
+            return datetime.fromtimestamp(int(time_part[:12], 16) / 1000, tz=UTC)
+
+        if len(time_part) not in (6, 12) or not time_part.isdigit():
+            return None
+
+        return datetime(
+            int(parts[0]), int(parts[1]), int(parts[2]), int(time_part[:2]), int(time_part[2:4]), int(time_part[4:6]),
+            int(time_part[6:] or 0), tzinfo=UTC
+        )
+    except ValueError:
+        return None
+
+
+def get_sort_key(key: str) -> tuple[datetime, str]:
+    return get_key_time(key) or datetime.max.replace(tzinfo=UTC), key.rsplit('/', 1)[-1]
+
+
+def parse_audit_key(key: str) -> AuditKey | None:
+    """
+    Parses a logical audit key: `YYYY/MM/DD/<name>/<operation>/<id>_<direction>.xml[.gz|.zst]`, or the older
+    `.../<HHMMSS>_<uuid12>_<direction>.xml`.
+    """
+    parts = key.split('/')
+
+    if len(parts) != 6 or (timestamp := get_key_time(key)) is None:
+        return None
+
+    direction = parts[5].split('.', 1)[0].rsplit('_', 1)[-1]
+
+    return AuditKey(key, parts[3], parts[4], direction, timestamp)
+
+
+def get_shard_count(shards: int | None = None) -> int:
+    shards = audit_settings.audit_key_shards if shards is None else shards
+
+    if not 1 <= shards <= MAX_SHARDS:
+        raise ValueError(f'Audit key shards must be between 1 and {MAX_SHARDS}, got: {shards}')
+
+    return shards
+
+
+def get_shard_names(shards: int | None = None) -> list[str]:
+    """
+    Hex shard prefixes, e.g. `0`..`f` for 16 shards or `00`..`ff` for 256. A single shard means no prefix at all.
+    """
+    if (shards := get_shard_count(shards)) == 1:
+        return []
+
+    width = len(f'{shards - 1:x}')
+
+    return [f'{shard:0{width}x}' for shard in range(shards)]
+
+
+def get_object_key(key: str, shards: int | None = None) -> str:
+    """
+    Maps a logical audit key (`YYYY/MM/DD/...`) to the key it is stored under. With more than one shard the key gets a
+    stable hash prefix, spreading a day's writes over that many S3 partitions: `<shard>/YYYY/MM/DD/...`.
+    """
+    if not (shard_names := get_shard_names(shards)):
+        return key
+
+    return f'{shard_names[zlib.crc32(key.encode()) % len(shard_names)]}/{key}'
+
+
+def get_logical_key(object_key: str) -> str:
+    return _SHARD_RE.sub('', object_key, count=1)
+
+
+def list_shard_names(bucket_name: str, root_prefix: str) -> list[str]:
+    """
+    Shard prefixes holding data under `root_prefix`, found with one delimited listing. Unlike `get_shard_names` this
+    includes shards written with an earlier `audit_key_shards`, so changing the shard count never hides data.
+    """
+    shard_names = set()
+
+    for obj in object_storage.list_objects(bucket_name, root_prefix, recursive=False):
+        if obj.is_dir and _SHARD_NAME_RE.fullmatch(name := obj.object_name.removeprefix(root_prefix).rstrip('/')):
+            shard_names.add(name)
+
+    return sorted(shard_names)
+
+
+def get_day_prefixes(root_path: str, day: date, shard_names: Iterable[str] | None = None) -> list[str]:
+    """
+    Every prefix a day's audit objects may live under: one per shard plus the unsharded layout, so data written before
+    sharding was enabled is still found. Shards default to the configured ones; pass `list_shard_names` to cover data
+    written with other shard counts.
+    """
+    day_path = f'{day:%Y/%m/%d}/'
+    shard_names = get_shard_names() if shard_names is None else shard_names
+
+    return [f'{root_path}/{shard}/{day_path}' for shard in shard_names] + [f'{root_path}/{day_path}']
+
+
+def get_record_codec(key: str) -> Codec | None:
+    """
+    Audit records whose key ends with a record codec extension (`.xml.gz`, `.xml.zst`) are stored compressed, as
+    opaque `application/gzip` or `application/zstd` objects. They must not get a Content-Encoding: HTTP clients
+    decompress such bodies on the fly, while readers go by the key and expect the stored bytes.
+    """
+    for codec_name in RECORD_CODECS:
+        if key.endswith((codec := CODECS[codec_name]).extension):
+            return codec
+
+    return None
+
+
+def get_record_suffix(codec: Codec | str | None) -> str:
+    if codec is None:
+        return ''
+
+    if (codec := get_codec(codec)).name not in RECORD_CODECS:
+        raise ValueError(f'Unsupported audit record codec: {codec.name}, supported: {", ".join(RECORD_CODECS)}')
+
+    return codec.extension
+
+
+def get_record_content_type(key: str) -> str:
+    if codec := get_record_codec(key):
+        return codec.content_type
+
+    return 'application/octet-stream'
+
+
+def encode_record(key: str, data: bytes) -> bytes:
+    if codec := get_record_codec(key):
+        return compress(data, codec, audit_settings.audit_record_level)
+
+    return data
+
+
+def decode_record(key: str, data: bytes) -> bytes:
+    if codec := get_record_codec(key):
+        return decompress(data, codec)
+
+    return data
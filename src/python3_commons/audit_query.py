@@ -0,0 +1,183 @@
+import logging
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, UTC
+from typing import Callable, Generator, Iterable, TypeVar
+
+from python3_commons import audit_keys, audit_segments, object_storage
+from python3_commons.audit_archive import ArchiveIndex, ArchiveMember, get_archive_indexes, read_archive_members
+from python3_commons.audit_keys import AuditKey, parse_audit_key
+from python3_commons.conf import s3_settings
+from python3_commons.helpers import date_range
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+@dataclass
+class AuditRecord:
+    key: str
+    name: str
+    operation: str
+    direction: str
+    timestamp: datetime
+    data: bytes
+
+
+class AuditFilter:
+    def __init__(self, name: str | None, operation: str | None, since: datetime, until: datetime,
+                 direction: str | None):
+        self.name = name
+        self.operation = operation
+        self.since = (since if since.tzinfo else since.replace(tzinfo=UTC)).replace(microsecond=0)
+        self.until = until if until.tzinfo else until.replace(tzinfo=UTC)
+        self.direction = direction
+
+    def get_prefix(self, day: date) -> str:
+        prefix = f'{day:%Y/%m/%d}/'
+
+        if self.name:
+            prefix = f'{prefix}{self.name}/'
+
+            if self.operation:
+                prefix = f'{prefix}{self.operation}/'
+
+        return prefix
+
+    def match(self, key: str) -> AuditKey | None:
+        if (audit_key := parse_audit_key(key)) is None:
+            return None
+
+        if self.name and audit_key.name != self.name:
+            return None
+
+        if self.operation and audit_key.operation != self.operation:
+            return None
+
+        if self.direction and audit_key.direction != self.direction:
+            return None
+
+        if not self.since <= audit_key.timestamp <= self.until:
+            return None
+
+        return audit_key
+
+
+def bounded_map(executor: Executor, fn: Callable[[T], R], items: Iterable[T],
+                max_pending: int) -> Generator[R, None, None]:
+    """
+    Ordered `Executor.map` that keeps at most `max_pending` calls submitted ahead of the consumer.
+    """
+    pending: deque[Future] = deque()
+
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _make_record(audit_key: AuditKey, data: bytes) -> AuditRecord:
+    return AuditRecord(audit_key.key, audit_key.name, audit_key.operation, audit_key.direction, audit_key.timestamp,
+                       audit_keys.decode_record(audit_key.key, data))
+
+
+def _expand_segment(audit_filter: AuditFilter, data: bytes) -> Generator[AuditRecord, None, None]:
+    for key, record_data in audit_segments.iter_segment_records(data):
+        if audit_key := audit_filter.match(key):
+            yield _make_record(audit_key, record_data)
+
+
+def _iter_archived(bucket_name: str, index: ArchiveIndex, audit_filter: AuditFilter, root_prefix: str,
+                   executor: Executor, workers: int) -> Generator[AuditRecord, None, None]:
+    members: list[tuple[ArchiveMember, AuditKey | None]] = []
+
+    for member in index.members:
+        key = audit_keys.get_logical_key(member.name.removeprefix(root_prefix))
+
+        if audit_segments.is_segment_key(key):
+            members.append((member, None))
+        elif audit_key := audit_filter.match(key):
+            members.append((member, audit_key))
+
+    if not members:
+        return
+
+    def fetch(group: list[ArchiveMember]) -> list[tuple[ArchiveMember, bytes]]:
+        return list(read_archive_members(bucket_name, index, group))
+
+    member_keys = {member.name: audit_key for member, audit_key in members}
+    groups = index.group_members([member for member, _ in members])
+
+    for group in bounded_map(executor, fetch, groups, workers * 2):
+        for member, data in group:
+            if (audit_key := member_keys[member.name]) is None:
+                yield from _expand_segment(audit_filter, data)
+            else:
+                yield _make_record(audit_key, data)
+
+
+def _iter_live(bucket_name: str, day: date, audit_filter: AuditFilter, root_prefix: str, shard_names: list[str],
+               workers: int) -> Generator[AuditRecord, None, None]:
+    shard_prefixes = [f'{root_prefix}{shard}/' for shard in shard_names] + [root_prefix]
+    prefixes = [f'{shard_prefix}{audit_filter.get_prefix(day)}' for shard_prefix in shard_prefixes]
+
+    if audit_filter.name:
+        prefixes += [f'{shard_prefix}{day:%Y/%m/%d}/{audit_segments.SEGMENT_DIR}/' for shard_prefix in shard_prefixes]
+
+    matched: dict[str, AuditKey | None] = {}
+
+    def list_matching():
+        for obj in object_storage.list_objects_parallel(bucket_name, prefixes, workers):
+            key = audit_keys.get_logical_key(obj.object_name.removeprefix(root_prefix))
+
+            if audit_segments.is_segment_key(key):
+                matched[obj.object_name] = None
+            elif audit_key := audit_filter.match(key):
+                matched[obj.object_name] = audit_key
+            else:
+                continue
+
+            yield obj
+
+    for object_name, _, _, stream in object_storage.prefetch_object_streams(bucket_name, list_matching(), workers):
+        data = stream.read()
+
+        if (audit_key := matched.pop(object_name)) is None:
+            yield from _expand_segment(audit_filter, data)
+        else:
+            yield _make_record(audit_key, data)
+
+
+def iter_audit(name: str | None = None, operation: str | None = None, since: datetime | None = None,
+               until: datetime | None = None, direction: str | None = None, root_path: str = 'audit',
+               workers: int = 8) -> Generator[AuditRecord, None, None]:
+    """
+    Lazily yields audit records matching the filters, day by day. Days with archives are read through their indexes
+    with ranged GETs of the frames holding matching members; live objects (and batched segments) are listed under the
+    narrowest key prefix the filters allow, in every key shard present concurrently. `since` is rounded down to the
+    second, the resolution of older keys; it defaults to the start of `until`'s day and `until` to now.
+    """
+    until = until or datetime.now(tz=UTC)
+    since = since or datetime.combine(until.date(), datetime.min.time(), tzinfo=UTC)
+    audit_filter = AuditFilter(name, operation, since, until, direction)
+    bucket_name = s3_settings.s3_bucket
+    root_prefix = object_storage.get_absolute_path(f'{root_path}/')
+    shard_names = audit_keys.list_shard_names(bucket_name, root_prefix)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audit-query') as executor:
+        for day in date_range(audit_filter.since.date(), audit_filter.until.date()):
+            for index in get_archive_indexes(bucket_name, day):
+                yield from _iter_archived(bucket_name, index, audit_filter, root_prefix, executor, workers)
+
+            yield from _iter_live(bucket_name, day, audit_filter, root_prefix, shard_names, workers)
@@ -0,0 +1,98 @@
+import logging
+import struct
+from typing import Generator, Iterable
+
+from python3_commons import audit_keys
+from python3_commons.serializers.msgspec import deserialize_msgpack, serialize_msgpack
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b'PCAS'
+SEGMENT_VERSION = 1
+SEGMENT_DIR = '.segments'
+SEGMENT_SUFFIX = '.seg'
+
+_HEADER = struct.Struct('>4sB')
+_LENGTH = struct.Struct('>I')
+_FOOTER = struct.Struct('>I4s')
+
+
+def encode_segment(records: Iterable[tuple[str, bytes]]) -> bytes:
+    """
+    Frames audit records into a single segment:
+
+        header:  magic, version
+        records: u32 length, msgpack([key, data]) ...
+        index:   msgpack([[key, offset, length], ...]) pointing at each record body
+        footer:  u32 index length, magic
+    """
+    parts = [_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION)]
+    offset = _HEADER.size
+    index = []
+
+    for key, data in records:
+        record = serialize_msgpack([key, data])
+        parts.append(_LENGTH.pack(len(record)))
+        parts.append(record)
+        offset += _LENGTH.size
+        index.append([key, offset, len(record)])
+        offset += len(record)
+
+    index_data = serialize_msgpack(index)
+    parts.append(index_data)
+    parts.append(_FOOTER.pack(len(index_data), SEGMENT_MAGIC))
+
+    return b''.join(parts)
+
+
+def _check_segment(data: bytes | memoryview):
+    if len(data) < _HEADER.size + _FOOTER.size:
+        raise ValueError('Audit segment is truncated')
+
+    magic, version = _HEADER.unpack_from(data)
+
+    if magic != SEGMENT_MAGIC or _FOOTER.unpack_from(data, len(data) - _FOOTER.size)[1] != SEGMENT_MAGIC:
+        raise ValueError('Not an audit segment')
+
+    if version != SEGMENT_VERSION:
+        raise ValueError(f'Unsupported audit segment version: {version}')
+
+
+def read_segment_index(data: bytes | memoryview) -> list[tuple[str, int, int]]:
+    _check_segment(data)
+    index_size, _ = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+    index_end = len(data) - _FOOTER.size
+    index = deserialize_msgpack(memoryview(data)[index_end - index_size:index_end])
+
+    return [(key, offset, length) for key, offset, length in index]
+
+
+def iter_segment_records(data: bytes | memoryview) -> Generator[tuple[str, bytes], None, None]:
+    view = memoryview(data)
+
+    for key, offset, length in read_segment_index(view):
+        record_key, record_data = deserialize_msgpack(view[offset:offset + length])
+
+        yield record_key, record_data
+
+
+def is_segment_key(key: str) -> bool:
+    return key.endswith(SEGMENT_SUFFIX) and f'/{SEGMENT_DIR}/' in key
+
+
+def make_segment_key(date_path: str) -> str:
+    _, key_id = audit_keys.generate_key_id()
+
+    return f'{date_path}/{SEGMENT_DIR}/{key_id}{SEGMENT_SUFFIX}'
+
+
+def group_by_date_path(records: Iterable[tuple[str, bytes]]) -> dict[str, list[tuple[str, bytes]]]:
+    """
+    Groups records by their `YYYY/MM/DD` key prefix, so each segment lands under the same day as its records.
+    """
+    groups = {}
+
+    for key, data in records:
+        groups.setdefault(key[:10], []).append((key, data))
+
+    return groups
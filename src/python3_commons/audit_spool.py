@@ -0,0 +1,268 @@
+import logging
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Callable, Generator
+
+import msgspec
+
+from python3_commons.audit import write_audit_data_sync
+from python3_commons.conf import S3Settings, audit_settings, s3_settings
+from python3_commons.serializers.msgspec import deserialize_msgpack, serialize_msgpack
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = '.open'
+READY_SUFFIX = '.ready'
+CORRUPT_SUFFIX = '.corrupt'
+
+_LENGTH = struct.Struct('>I')
+
+
+@dataclass
+class AuditSpoolStats:
+    appended: int = 0
+    rejected: int = 0
+    uploaded: int = 0
+    upload_failures: int = 0
+    quarantined: int = 0
+
+
+def _read_segment(path: Path) -> tuple[list[tuple[str, bytes]], int, int]:
+    """
+    Decodes the records of a spool segment, returning them with the offset reading stopped at and the segment size.
+
+    Reading stops at the first truncated or undecodable frame; everything from that offset on is unreadable.
+    """
+    data = path.read_bytes()
+    view = memoryview(data)
+    offset = 0
+    records = []
+
+    while offset < len(view):
+        if offset + _LENGTH.size > len(view):
+            logger.warning(f'Truncated record length in audit spool segment {path} at {offset}')
+            break
+
+        length, = _LENGTH.unpack_from(view, offset)
+
+        if offset + _LENGTH.size + length > len(view):
+            logger.warning(f'Truncated record in audit spool segment {path} at {offset}')
+            break
+
+        try:
+            key, record_data = deserialize_msgpack(view[offset + _LENGTH.size:offset + _LENGTH.size + length])
+        except (msgspec.DecodeError, TypeError, ValueError) as e:
+            logger.warning(f'Undecodable record in audit spool segment {path} at {offset}: {e}')
+            break
+
+        offset += _LENGTH.size + length
+        records.append((key, record_data))
+
+    return records, offset, len(view)
+
+
+def iter_spool_records(path: Path) -> Generator[tuple[str, bytes], None, None]:
+    records, _, _ = _read_segment(path)
+
+    yield from records
+
+
+class AuditSpool:
+    """
+    Append-only local write-ahead spool for audit records.
+
+    Records are appended to a rolling segment file and fsync'd in groups of `sync_records` or every `sync_interval`
+    seconds. Segments are sealed once they reach `segment_max_bytes` or `segment_max_age` seconds and a background
+    thread replays them to object storage in order, retrying with exponential backoff. Appends never touch S3; once the
+    spool holds `max_bytes` on disk new records are rejected.
+    """
+    def __init__(self, path: str | Path | None = None, writer: Callable[[str, bytes], bool] | None = None,
+                 settings: S3Settings = s3_settings, segment_max_bytes: int | None = None,
+                 segment_max_age: float | None = None, max_bytes: int | None = None,
+                 sync_records: int | None = None, sync_interval: float | None = None,
+                 retry_max_delay: float | None = None):
+        if not (path := path or audit_settings.audit_spool_path):
+            raise ValueError('audit_settings.audit_spool_path must be set')
+
+        self.path = Path(path)
+        self.writer = writer or partial(write_audit_data_sync, settings)
+        self.segment_max_bytes = segment_max_bytes or audit_settings.audit_spool_segment_max_bytes
+        self.segment_max_age = segment_max_age or audit_settings.audit_spool_segment_max_age
+        self.max_bytes = max_bytes or audit_settings.audit_spool_max_bytes
+        self.sync_records = sync_records or audit_settings.audit_spool_sync_records
+        self.sync_interval = sync_interval or audit_settings.audit_spool_sync_interval
+        self.retry_max_delay = retry_max_delay or audit_settings.audit_spool_retry_max_delay
+        self.stats = AuditSpoolStats()
+        self._lock = threading.Lock()
+        self._fd: int | None = None
+        self._segment_path: Path | None = None
+        self._segment_size = 0
+        self._segment_opened = 0.0
+        self._unsynced = 0
+        self._progress: dict[Path, int] = {}
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='audit-spool-uploader', daemon=True)
+        self._thread.start()
+
+    def _recover(self):
+        for segment_path in self.path.glob(f'*{OPEN_SUFFIX}'):
+            logger.info(f'Recovering audit spool segment: {segment_path}')
+            segment_path.rename(segment_path.with_suffix(READY_SUFFIX))
+
+        self.disk_usage = sum(segment_path.stat().st_size for segment_path in self.path.glob(f'*{READY_SUFFIX}'))
+
+    def _open_segment(self):
+        self._segment_path = self.path / f'{time.time_ns():020}{OPEN_SUFFIX}'
+        self._fd = os.open(self._segment_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._segment_size = 0
+        self._segment_opened = time.monotonic()
+
+    def _sync(self):
+        os.fsync(self._fd)
+        self._unsynced = 0
+
+    def _seal(self):
+        self._sync()
+        os.close(self._fd)
+        self._segment_path.rename(self._segment_path.with_suffix(READY_SUFFIX))
+        self._fd = None
+        self._segment_path = None
+        self._wakeup.set()
+
+    def append(self, key: str, data: bytes) -> bool:
+        record = serialize_msgpack([key, data])
+        frame = _LENGTH.pack(len(record)) + record
+
+        with self._lock:
+            if self.disk_usage + len(frame) > self.max_bytes:
+                self.stats.rejected += 1
+                logger.error(f'Audit spool is over its disk budget, rejected: {key}')
+
+                return False
+
+            if self._fd is None:
+                self._open_segment()
+
+            os.write(self._fd, frame)
+            self._segment_size += len(frame)
+            self.disk_usage += len(frame)
+            self._unsynced += 1
+            self.stats.appended += 1
+
+            if self._unsynced >= self.sync_records:
+                self._sync()
+
+            if self._segment_size >= self.segment_max_bytes:
+                self._seal()
+
+        return True
+
+    submit = append
+
+    def _maintain(self):
+        with self._lock:
+            if self._fd is not None:
+                if self._unsynced:
+                    self._sync()
+
+                if time.monotonic() - self._segment_opened >= self.segment_max_age:
+                    self._seal()
+
+    def _upload_segment(self, segment_path: Path) -> bool:
+        uploaded = self._progress.get(segment_path, 0)
+        records, end, size = _read_segment(segment_path)
+
+        for i, (key, data) in enumerate(records):
+            if i < uploaded:
+                continue
+
+            try:
+                written = self.writer(key, data)
+            except Exception as e:
+                logger.error(f'Failed replaying audit record: {key}', exc_info=e)
+                written = False
+
+            if not written:
+                self._progress[segment_path] = i
+                self.stats.upload_failures += 1
+
+                return False
+
+            self.stats.uploaded += 1
+
+        if end < size:
+            self._quarantine(segment_path, end)
+
+        segment_path.unlink()
+        self._progress.pop(segment_path, None)
+
+        with self._lock:
+            self.disk_usage -= size
+
+        return True
+
+    def _quarantine(self, segment_path: Path, offset: int):
+        corrupt_path = segment_path.with_suffix(CORRUPT_SUFFIX)
+
+        with segment_path.open('rb') as source, corrupt_path.open('wb') as target:
+            source.seek(offset)
+            target.write(source.read())
+
+        self.stats.quarantined += 1
+        logger.error(f'Unreadable tail of audit spool segment {segment_path} from {offset} moved to {corrupt_path}')
+
+    def upload_ready(self) -> bool:
+        for segment_path in sorted(self.path.glob(f'*{READY_SUFFIX}')):
+            if not self._upload_segment(segment_path):
+                return False
+
+        return True
+
+    def _run(self):
+        delay = 0.0
+        next_attempt = 0.0
+
+        while not self._stop.is_set():
+            self._wakeup.wait(self.sync_interval)
+            self._wakeup.clear()
+
+            try:
+                self._maintain()
+
+                if time.monotonic() < next_attempt:
+                    continue
+
+                uploaded = self.upload_ready()
+            except Exception as e:
+                logger.error('Audit spool uploader failed', exc_info=e)
+                uploaded = False
+
+            if uploaded:
+                delay = 0.0
+            else:
+                delay = min(max(delay * 2, self.sync_interval), self.retry_max_delay)
+                logger.warning(f'Audit spool upload failed, retrying in {delay:.1f}s')
+
+            next_attempt = time.monotonic() + delay
+
+    def close(self, upload: bool = True):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+
+        with self._lock:
+            if self._fd is not None:
+                self._seal()
+
+        if upload:
+            self.upload_ready()
@@ -0,0 +1,177 @@
+import bz2
+import logging
+import lzma
+import multiprocessing
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Generator, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    extension: str
+    content_type: str
+    default_level: int
+    compressor_factory: Callable[[int], Any]
+    decompressor_factory: Callable[[], Any]
+
+    def compressor(self, level: int | None = None):
+        return self.compressor_factory(self.default_level if level is None else level)
+
+    def decompressor(self):
+        return self.decompressor_factory()
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError('zstd codec requires the zstandard package: pip install python3-commons[zstd]') from e
+
+    return zstandard
+
+
+def _zstd_compressor(level: int):
+    return _import_zstandard().ZstdCompressor(level=level).compressobj()
+
+
+def _zstd_decompressor():
+    return _import_zstandard().ZstdDecompressor().decompressobj()
+
+
+CODECS: dict[str, Codec] = {
+    codec.name: codec
+    for codec in (
+        Codec('bz2', '.bz2', 'application/x-bzip2', 9, bz2.BZ2Compressor, bz2.BZ2Decompressor),
+        Codec(
+            'gzip', '.gz', 'application/gzip', 6,
+            lambda level: zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS),
+            lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+        ),
+        Codec(
+            'xz', '.xz', 'application/x-xz', 6,
+            lambda level: lzma.LZMACompressor(preset=level),
+            lzma.LZMADecompressor
+        ),
+        Codec('zstd', '.zst', 'application/zstd', 3, _zstd_compressor, _zstd_decompressor),
+    )
+}
+
+
+def get_codec(codec: Codec | str) -> Codec:
+    if isinstance(codec, Codec):
+        return codec
+
+    try:
+        return CODECS[codec]
+    except KeyError:
+        raise ValueError(f'Unknown compression codec: {codec}, supported: {", ".join(CODECS)}') from None
+
+
+def generate_compressed(chunks: Iterable[bytes], codec: Codec | str = 'bz2',
+                        level: int | None = None) -> Generator[bytes, None, None]:
+    compressor = get_codec(codec).compressor(level)
+
+    for chunk in chunks:
+        if compressed_chunk := compressor.compress(chunk):
+            yield compressed_chunk
+
+    if compressed_chunk := compressor.flush():
+        yield compressed_chunk
+
+
+def generate_decompressed(chunks: Iterable[bytes], codec: Codec | str = 'bz2') -> Generator[bytes, None, None]:
+    """
+    Decompresses a stream that may consist of several concatenated streams (members, frames), as produced by
+    `generate_compressed_parallel`.
+    """
+    codec = get_codec(codec)
+    decompressor = codec.decompressor()
+
+    for chunk in chunks:
+        while chunk:
+            if data := decompressor.decompress(chunk):
+                yield data
+
+            if not decompressor.eof:
+                break
+
+            chunk = decompressor.unused_data
+            decompressor = codec.decompressor()
+
+
+def compress(data: bytes, codec: Codec | str = 'bz2', level: int | None = None) -> bytes:
+    compressor = get_codec(codec).compressor(level)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data: bytes, codec: Codec | str = 'bz2') -> bytes:
+    return b''.join(generate_decompressed((data, ), codec))
+
+
+def rechunk(chunks: Iterable[bytes], block_size: int) -> Generator[bytes, None, None]:
+    buffer = bytearray()
+
+    for chunk in chunks:
+        buffer += chunk
+
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+
+    if buffer:
+        yield bytes(buffer)
+
+
+def _compress_block(codec_name: str, level: int | None, block: bytes) -> bytes:
+    return compress(block, codec_name, level)
+
+
+def compress_blocks(blocks: Iterable[bytes], codec: Codec | str = 'bz2', level: int | None = None,
+                    workers: int | None = None) -> Generator[bytes, None, None]:
+    """
+    Compresses every block into an independent stream and yields them in order. With more than one worker blocks are
+    compressed in a process pool, at most two blocks per worker in flight.
+    """
+    codec = get_codec(codec)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for block in blocks:
+            yield _compress_block(codec.name, level, block)
+
+        return
+
+    # Forking a process that already runs threads (prefetching, uploads) may deadlock the children
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+    pending = deque()
+
+    try:
+        for block in blocks:
+            pending.append(executor.submit(_compress_block, codec.name, level, block))
+
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def generate_compressed_parallel(chunks: Iterable[bytes], codec: Codec | str = 'bz2', level: int | None = None,
+                                 block_size: int = 4 * 1024 * 1024,
+                                 workers: int | None = None) -> Generator[bytes, None, None]:
+    """
+    Splits the input into `block_size` blocks and compresses them on all cores. The result is a valid multi-stream
+    file for every codec (concatenated bz2/xz streams, gzip members, zstd frames).
+    """
+    yield from compress_blocks(rechunk(chunks, block_size), codec, level, workers)
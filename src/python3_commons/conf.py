@@ -17,7 +17,48 @@ class S3Settings(BaseSettings):
     s3_bucket: str | None = None
     s3_bucket_root: str | None = None
     s3_cert_verify: bool = True
+    s3_max_pool_connections: int = 10
+    s3_pool_block: bool = False
+    s3_connect_timeout: float = 10.0
+    s3_read_timeout: float = 300.0
+    s3_tcp_keepalive: bool = True
+    s3_tcp_keepalive_idle: int = 60
+    s3_tcp_keepalive_interval: int = 15
+    s3_tcp_keepalive_count: int = 4
+    s3_max_retries: int = 5
+    s3_retry_backoff_factor: float = 0.2
+
+
+class AuditSettings(BaseSettings):
+    audit_max_in_flight: int = 16
+    audit_sink_max_size: int = 1000
+    audit_sink_workers: int = 4
+    audit_sink_overflow: str = 'block'
+    audit_key_shards: int = 1
+    audit_serialization: str = 'compact'
+    audit_record_codec: str | None = None
+    audit_record_level: int | None = None
+    audit_batch_max_records: int = 1
+    audit_batch_max_bytes: int = 8 * 1024 * 1024
+    audit_batch_max_delay: float = 0.5
+    audit_spool_path: str | None = None
+    audit_spool_segment_max_bytes: int = 16 * 1024 * 1024
+    audit_spool_segment_max_age: float = 1.0
+    audit_spool_max_bytes: int = 1024 * 1024 * 1024
+    audit_spool_sync_records: int = 100
+    audit_spool_sync_interval: float = 0.2
+    audit_spool_retry_max_delay: float = 60.0
+    audit_archive_workers: int = 8
+    audit_archive_buffer_bytes: int = 64 * 1024 * 1024
+    audit_archive_codec: str = 'bz2'
+    audit_archive_level: int | None = None
+    audit_archive_compression_workers: int = 1
+    audit_archive_block_size: int = 4 * 1024 * 1024
+    audit_archive_delete_workers: int = 4
+    audit_archive_upload_workers: int = 4
+    audit_restore_workers: int = 8
 
 
 settings = CommonSettings()
 s3_settings = S3Settings()
+audit_settings = AuditSettings()
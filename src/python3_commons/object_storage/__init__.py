@@ -0,0 +1,720 @@
+import hashlib
+import io
+import itertools
+import logging
+import os
+import queue
+import re
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Generator, Iterable
+
+import certifi
+import urllib3
+from minio import Minio
+from minio.datatypes import Object, Part
+from minio.deleteobjects import DeleteObject, DeleteError
+from urllib3 import Retry, Timeout
+from urllib3.connection import HTTPConnection
+
+from python3_commons.conf import s3_settings, S3Settings
+from python3_commons.helpers import SingletonMeta
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+@dataclass
+class TransferStats:
+    objects: int = 0
+    bytes: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def objects_per_second(self) -> float:
+        return self.objects / elapsed if (elapsed := self.elapsed) else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / elapsed if (elapsed := self.elapsed) else 0.0
+
+    def add(self, size: int):
+        self.objects += 1
+        self.bytes += size
+
+
+@dataclass
+class DeleteStats:
+    deleted: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+
+class MultipartETag:
+    """
+    Computes the ETag S3 reports for an object uploaded in `part_size` parts: the plain MD5 for a single part upload,
+    otherwise the MD5 of the part MD5s followed by the part count.
+    """
+    def __init__(self, part_size: int):
+        self.part_size = part_size
+        self.size = 0
+        self._part = hashlib.md5(usedforsecurity=False)
+        self._part_size = 0
+        self._digests: list[bytes] = []
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+
+        while view:
+            chunk = view[:self.part_size - self._part_size]
+            self._part.update(chunk)
+            self._part_size += len(chunk)
+            self.size += len(chunk)
+            view = view[len(chunk):]
+
+            if self._part_size == self.part_size:
+                self._digests.append(self._part.digest())
+                self._part = hashlib.md5(usedforsecurity=False)
+                self._part_size = 0
+
+    def hexdigest(self) -> str:
+        digests = self._digests
+
+        if self._part_size or not digests:
+            digests = [*digests, self._part.digest()]
+
+        if len(digests) == 1:
+            return digests[0].hex()
+
+        return f'{hashlib.md5(b"".join(digests), usedforsecurity=False).hexdigest()}-{len(digests)}'
+
+
+@dataclass
+class PoolStats:
+    pools: int = 0
+    max_connections: int = 0
+    in_use: int = 0
+    idle: int = 0
+    connections_created: int = 0
+    requests: int = 0
+
+    @property
+    def utilization(self) -> float:
+        return self.in_use / self.max_connections if self.max_connections else 0.0
+
+
+def get_socket_options(settings: S3Settings) -> list[tuple[int, int, int]]:
+    socket_options = list(HTTPConnection.default_socket_options)
+
+    if settings.s3_tcp_keepalive:
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+        for option, value in (
+            ('TCP_KEEPIDLE', settings.s3_tcp_keepalive_idle),
+            ('TCP_KEEPINTVL', settings.s3_tcp_keepalive_interval),
+            ('TCP_KEEPCNT', settings.s3_tcp_keepalive_count),
+        ):
+            if hasattr(socket, option):
+                socket_options.append((socket.IPPROTO_TCP, getattr(socket, option), value))
+
+    return socket_options
+
+
+def get_http_client(settings: S3Settings) -> urllib3.PoolManager:
+    """
+    Same pool manager Minio builds by default, with pool size, timeouts, TCP keepalive and retries taken from
+    settings. Keep `s3_max_pool_connections` at least as high as the number of threads doing S3 I/O at a time
+    (prefetch, upload, delete workers), otherwise surplus connections are opened and discarded per request, or with
+    `s3_pool_block` threads wait for a free one.
+    """
+    return urllib3.PoolManager(
+        timeout=Timeout(connect=settings.s3_connect_timeout, read=settings.s3_read_timeout),
+        maxsize=settings.s3_max_pool_connections,
+        block=settings.s3_pool_block,
+        cert_reqs='CERT_REQUIRED' if settings.s3_cert_verify else 'CERT_NONE',
+        ca_certs=os.environ.get('SSL_CERT_FILE') or certifi.where(),
+        retries=Retry(
+            total=settings.s3_max_retries,
+            backoff_factor=settings.s3_retry_backoff_factor,
+            status_forcelist=[500, 502, 503, 504]
+        ),
+        socket_options=get_socket_options(settings)
+    )
+
+
+def get_http_pool_stats(http_client: urllib3.PoolManager) -> PoolStats:
+    stats = PoolStats()
+
+    for key in http_client.pools.keys():
+        if (pool := http_client.pools.get(key)) is None or pool.pool is None:
+            continue
+
+        # The pool queue starts filled with `maxsize` placeholders, connections are taken out while in use
+        stats.pools += 1
+        stats.max_connections += pool.pool.maxsize
+        stats.in_use += pool.pool.maxsize - pool.pool.qsize()
+        stats.idle += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        stats.connections_created += pool.num_connections
+        stats.requests += pool.num_requests
+
+    return stats
+
+
+class ObjectStorage(metaclass=SingletonMeta):
+    def __init__(self, settings: S3Settings):
+        if not s3_settings.s3_endpoint_url:
+            raise ValueError('s3_settings.s3_endpoint_url must be set')
+
+        self._http_client = get_http_client(settings)
+        self._client = Minio(
+            settings.s3_endpoint_url,
+            region=settings.s3_region_name,
+            access_key=settings.s3_access_key_id.get_secret_value(),
+            secret_key=settings.s3_secret_access_key.get_secret_value(),
+            secure=settings.s3_secure,
+            http_client=self._http_client
+        )
+
+    def get_client(self) -> Minio:
+        return self._client
+
+    def get_pool_stats(self) -> PoolStats:
+        return get_http_pool_stats(self._http_client)
+
+
+def get_pool_stats() -> PoolStats:
+    return ObjectStorage(s3_settings).get_pool_stats()
+
+
+def get_absolute_path(path: str) -> str:
+    if path.startswith('/'):
+        path = path[1:]
+
+    if bucket_root := s3_settings.s3_bucket_root:
+        path = f'{bucket_root[:1] if bucket_root.startswith('/') else bucket_root}/{path}'
+
+    return path
+
+
+def put_object(bucket_name: str, path: str, data: io.BytesIO, length: int, part_size: int = 0,
+               content_type: str = 'application/octet-stream', metadata: dict[str, str] | None = None) -> str:
+    if s3_client := ObjectStorage(s3_settings).get_client():
+        result = s3_client.put_object(
+            bucket_name, path, data, length, part_size=part_size, content_type=content_type, metadata=metadata
+        )
+
+        logger.debug(f'Stored object into object storage: {bucket_name}:{path}')
+
+        return result.location
+    else:
+        logger.warning(f'No S3 client available, skipping object put')
+
+
+# Multipart uploads use Minio's protected calls (`_create_multipart_upload`, `_upload_part`,
+# `_complete_multipart_upload`, `_abort_multipart_upload`). The public `put_object(num_parallel_uploads=...)` pulls
+# from a readable stream and fails the whole upload on the first failed part, while `ObjectWriter` is fed by `write()`
+# calls and retries single parts. The minio version is pinned and `test_minio_multipart_api` checks the signatures.
+def _upload_part(s3_client: Minio, bucket_name: str, path: str, upload_id: str, part_number: int, data: bytes,
+                 retries: int) -> Part:
+    for attempt in itertools.count():
+        try:
+            return Part(part_number, s3_client._upload_part(bucket_name, path, data, None, upload_id, part_number))
+        except Exception as e:
+            if attempt >= retries:
+                raise
+
+            delay = 0.5 * 2 ** attempt
+            logger.warning(
+                f'Failed uploading part {part_number} of {bucket_name}:{path}, retrying in {delay:.1f}s', exc_info=e
+            )
+            time.sleep(delay)
+
+
+class ObjectWriter(io.RawIOBase):
+    """
+    Writable file object storing what is written as one object. Data is cut into `part_size` parts that are uploaded
+    in the background, up to `workers` at a time, so at most `workers + 1` parts are held in memory and `write()` only
+    blocks while all workers are busy. A failing part is retried `retries` times with exponential backoff.
+
+    `close()` (or leaving the `with` block) completes the upload, an exception in the `with` block or `abort()` aborts
+    it. Data fitting into a single part is stored with a plain PUT. The stored object's ETag is in `etag` afterwards.
+    """
+    def __init__(self, bucket_name: str, path: str, part_size: int = 8 * 1024 * 1024, workers: int = 4,
+                 content_type: str = 'application/octet-stream', retries: int = 3):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f'Part size must be at least {MIN_PART_SIZE} bytes, got: {part_size}')
+
+        super().__init__()
+        self.bucket_name = bucket_name
+        self.path = path
+        self.part_size = part_size
+        self.workers = workers
+        self.content_type = content_type
+        self.retries = retries
+        self.size = 0
+        self.etag: str | None = None
+        self._s3_client = ObjectStorage(s3_settings).get_client()
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: deque[Future] = deque()
+        self._parts: list[Part] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def _submit_part(self, data: bytes):
+        if self._upload_id is None:
+            self._upload_id = self._s3_client._create_multipart_upload(
+                self.bucket_name, self.path, {'Content-Type': self.content_type}
+            )
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='s3-upload')
+
+        part_number = len(self._parts) + len(self._pending) + 1
+        self._pending.append(self._executor.submit(
+            _upload_part, self._s3_client, self.bucket_name, self.path, self._upload_id, part_number, data,
+            self.retries
+        ))
+
+        if len(self._pending) >= self.workers:
+            self._parts.append(self._pending.popleft().result())
+
+    def write(self, data: bytes | memoryview) -> int:
+        if self.closed:
+            raise ValueError('write to closed object writer')
+
+        size = memoryview(data).nbytes
+        self._buffer += data
+        self.size += size
+
+        # A full part is held back until more data arrives, so that single part objects get a plain PUT
+        while len(self._buffer) > self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+
+        return size
+
+    def _complete(self):
+        if self._upload_id is None:
+            result = self._s3_client.put_object(
+                self.bucket_name, self.path, io.BytesIO(self._buffer), len(self._buffer), content_type=self.content_type
+            )
+            logger.debug(f'Stored object into object storage: {self.bucket_name}:{self.path}')
+        else:
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+
+            while self._pending:
+                self._parts.append(self._pending.popleft().result())
+
+            result = self._s3_client._complete_multipart_upload(
+                self.bucket_name, self.path, self._upload_id, self._parts
+            )
+            logger.debug(
+                f'Stored object into object storage in {len(self._parts)} parts: {self.bucket_name}:{self.path}'
+            )
+
+        self.etag = result.etag
+
+    def close(self):
+        if self.closed:
+            return
+
+        try:
+            self._complete()
+        except BaseException:
+            self.abort()
+
+            raise
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+            if self._executor:
+                self._executor.shutdown(wait=False)
+
+    def abort(self):
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+        if self._upload_id is not None:
+            logger.error(f'Aborting multipart upload of {self.bucket_name}:{self.path}')
+
+            try:
+                self._s3_client._abort_multipart_upload(self.bucket_name, self.path, self._upload_id)
+            except Exception as e:
+                logger.error(f'Failed aborting multipart upload of {self.bucket_name}:{self.path}', exc_info=e)
+
+            self._upload_id = None
+
+        self._buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __del__(self):
+        # A writer dropped without close() holds incomplete data, it must not be stored
+        if not self.closed:
+            self.abort()
+
+
+def put_object_parallel(bucket_name: str, path: str, data: BinaryIO, part_size: int = 8 * 1024 * 1024,
+                        workers: int = 4, content_type: str = 'application/octet-stream',
+                        retries: int = 3) -> str | None:
+    """
+    Uploads a stream of unknown length through an `ObjectWriter`, with up to `workers` parts in flight. Returns the
+    object ETag.
+    """
+    with ObjectWriter(bucket_name, path, part_size, workers, content_type, retries) as writer:
+        while chunk := data.read(part_size):
+            writer.write(chunk)
+
+    return writer.etag
+
+
+@contextmanager
+def get_object_stream(bucket_name: str, path: str, offset: int = 0, length: int = 0):
+    if s3_client := ObjectStorage(s3_settings).get_client():
+        logger.debug(f'Getting object from object storage: {bucket_name}:{path}')
+
+        try:
+            response = s3_client.get_object(bucket_name, path, offset=offset, length=length)
+        except Exception as e:
+            logger.debug(f'Failed getting object from object storage: {bucket_name}:{path}', exc_info=e)
+
+            raise
+
+        try:
+            yield response
+        finally:
+            response.close()
+            response.release_conn()
+    else:
+        logger.warning(f'No S3 client available, skipping object put')
+
+
+def get_object(bucket_name: str, path: str, offset: int = 0, length: int = 0) -> bytes:
+    with get_object_stream(bucket_name, path, offset, length) as stream:
+        body = stream.read()
+
+    logger.debug(f'Loaded object from object storage: {bucket_name}:{path}')
+
+    return body
+
+
+def stat_object(bucket_name: str, path: str) -> Object:
+    s3_client = ObjectStorage(s3_settings).get_client()
+
+    return s3_client.stat_object(bucket_name, path)
+
+
+def verify_object(bucket_name: str, path: str, size: int, etag: str | None = None) -> bool:
+    """
+    Checks a stored object against the expected size and, when the store reports MD5 based ETags, the expected ETag.
+    """
+    obj = stat_object(bucket_name, path)
+
+    if obj.size != size:
+        logger.error(f'Size mismatch for {bucket_name}:{path}: expected {size}, stored {obj.size}')
+
+        return False
+
+    if etag and (stored_etag := (obj.etag or '').strip('"')) and re.fullmatch(r'[0-9a-f]{32}(-\d+)?', stored_etag):
+        if stored_etag != etag:
+            logger.error(f'ETag mismatch for {bucket_name}:{path}: expected {etag}, stored {stored_etag}')
+
+            return False
+
+    return True
+
+
+def list_objects(bucket_name: str, prefix: str, recursive: bool = True) -> Generator[Object, None, None]:
+    s3_client = ObjectStorage(s3_settings).get_client()
+
+    yield from s3_client.list_objects(bucket_name, prefix=prefix, recursive=recursive)
+
+
+def list_objects_parallel(bucket_name: str, prefixes: Iterable[str], workers: int = 8, recursive: bool = True,
+                          max_buffer: int = 10000) -> Generator[Object, None, None]:
+    """
+    Lists several prefixes concurrently, `workers` at a time, and yields objects as they arrive, so results are not
+    ordered across prefixes. At most `max_buffer` listed objects wait for the consumer.
+    """
+    prefixes = list(prefixes)
+
+    if len(prefixes) == 1:
+        yield from list_objects(bucket_name, prefixes[0], recursive)
+
+        return
+
+    results: queue.Queue[Object | BaseException | None] = queue.Queue(max_buffer)
+    stopped = threading.Event()
+
+    def put(item: Object | BaseException | None):
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+
+            return
+
+    def list_prefix(prefix: str):
+        try:
+            for obj in list_objects(bucket_name, prefix, recursive):
+                if stopped.is_set():
+                    return
+
+                put(obj)
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-list')
+
+    try:
+        for prefix in prefixes:
+            executor.submit(list_prefix, prefix)
+
+        remaining = len(prefixes)
+
+        while remaining:
+            item = results.get()
+
+            if item is None:
+                remaining -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _get_objects_as_completed(bucket_name: str, objects: Iterable[Object], workers: int,
+                              max_buffer_bytes: int) -> Generator[tuple[str, datetime, bytes], None, None]:
+    objects = iter(objects)
+    next_obj = next(objects, None)
+    pending: dict[Future, Object] = {}
+    buffered_size = 0
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-get')
+
+    try:
+        while pending or next_obj is not None:
+            while next_obj is not None and len(pending) < workers * 4:
+                if not (size := next_obj.size or 0):
+                    yield next_obj.object_name, next_obj.last_modified, b''
+                elif pending and buffered_size + size > max_buffer_bytes:
+                    break
+                else:
+                    pending[executor.submit(get_object, bucket_name, next_obj.object_name)] = next_obj
+                    buffered_size += size
+
+                next_obj = next(objects, None)
+
+            if not pending:
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                obj = pending.pop(future)
+                buffered_size -= obj.size
+
+                yield obj.object_name, obj.last_modified, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_objects(bucket_name: str, path: str, recursive: bool = True, concurrency: int = 1, ordered: bool = True,
+                max_buffer_bytes: int = 64 * 1024 * 1024) -> Generator[tuple[str, datetime, bytes], None, None]:
+    """
+    Lists and downloads objects under `path`. With `concurrency` above 1 downloads run in a worker pool and results
+    come either in listing order (`ordered`) or as soon as each download completes. Either way at most
+    `max_buffer_bytes` of downloaded data waits for the consumer, apart from a single object bigger than that.
+    """
+    objects = list_objects(bucket_name, path, recursive)
+
+    if concurrency > 1 and ordered:
+        for object_name, last_modified, _, stream in prefetch_object_streams(
+            bucket_name, objects, concurrency, max_buffer_bytes
+        ):
+            yield object_name, last_modified, stream.read()
+    elif concurrency > 1:
+        yield from _get_objects_as_completed(bucket_name, objects, concurrency, max_buffer_bytes)
+    else:
+        for obj in objects:
+            object_name = obj.object_name
+
+            if obj.size:
+                data = get_object(bucket_name, object_name)
+            else:
+                data = b''
+
+            yield object_name, obj.last_modified, data
+
+
+def get_object_streams(bucket_name: str, path: str,
+                       recursive: bool = True) -> Generator[tuple[str, datetime, int, BinaryIO], None, None]:
+    """
+    Yields open response streams instead of object contents. Each stream is only valid until the next item is requested.
+    """
+    for obj in list_objects(bucket_name, path, recursive):
+        object_name = obj.object_name
+
+        if obj.size:
+            with get_object_stream(bucket_name, object_name) as stream:
+                yield object_name, obj.last_modified, obj.size, stream
+        else:
+            yield object_name, obj.last_modified, 0, io.BytesIO()
+
+
+def prefetch_object_streams(bucket_name: str, objects: Iterable[Object], workers: int = 8,
+                            max_buffer_bytes: int = 64 * 1024 * 1024, stream_threshold: int | None = None,
+                            stats: TransferStats | None = None
+                            ) -> Generator[tuple[str, datetime, int, BinaryIO], None, None]:
+    """
+    Same as `get_object_streams`, but downloads upcoming objects with `workers` threads while the current one is
+    consumed. Results keep listing order. At most `max_buffer_bytes` of prefetched data is held at a time; objects
+    bigger than `stream_threshold` (a quarter of the buffer by default) are streamed when reached instead.
+    """
+    if stream_threshold is None:
+        stream_threshold = max_buffer_bytes // 4
+
+    if stats is None:
+        stats = TransferStats()
+
+    objects = iter(objects)
+    next_obj = next(objects, None)
+    pending: deque[tuple[Object, Future | None]] = deque()
+    max_pending = workers * 4
+    buffered_size = 0
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-prefetch')
+
+    try:
+        while pending or next_obj is not None:
+            while next_obj is not None and len(pending) < max_pending:
+                size = next_obj.size or 0
+
+                if not size or size > stream_threshold:
+                    pending.append((next_obj, None))
+                elif pending and buffered_size + size > max_buffer_bytes:
+                    break
+                else:
+                    pending.append((next_obj, executor.submit(get_object, bucket_name, next_obj.object_name)))
+                    buffered_size += size
+
+                next_obj = next(objects, None)
+
+            obj, future = pending.popleft()
+            size = obj.size or 0
+
+            if future is not None:
+                data = future.result()
+                buffered_size -= size
+                stats.add(len(data))
+
+                yield obj.object_name, obj.last_modified, len(data), io.BytesIO(data)
+            elif size:
+                with get_object_stream(bucket_name, obj.object_name) as stream:
+                    yield obj.object_name, obj.last_modified, size, stream
+
+                stats.add(size)
+            else:
+                stats.add(0)
+
+                yield obj.object_name, obj.last_modified, 0, io.BytesIO()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def remove_object(bucket_name: str, object_name: str):
+    s3_client = ObjectStorage(s3_settings).get_client()
+    s3_client.remove_object(bucket_name, object_name)
+
+
+def remove_objects(bucket_name: str, prefix: str = None,
+                   object_names: Iterable[str] = None) -> Iterable[DeleteError] | None:
+    s3_client = ObjectStorage(s3_settings).get_client()
+
+    if prefix:
+        delete_object_list = map(
+            lambda obj: DeleteObject(obj.object_name), s3_client.list_objects(bucket_name, prefix=prefix,
+                                                                              recursive=True)
+        )
+    elif object_names:
+        delete_object_list = map(DeleteObject, object_names)
+    else:
+        return None
+
+    errors = s3_client.remove_objects(bucket_name, delete_object_list)
+
+    return errors
+
+
+def _delete_batch(bucket_name: str, object_names: list[str]) -> int:
+    s3_client = ObjectStorage(s3_settings).get_client()
+    failed = 0
+
+    for error in s3_client.remove_objects(bucket_name, map(DeleteObject, object_names)):
+        logger.error(f'Failed to delete object in {bucket_name=}: {error}')
+        failed += 1
+
+    return failed
+
+
+def delete_objects(bucket_name: str, object_names: Iterable[str], batch_size: int = 1000,
+                   workers: int = 4) -> DeleteStats:
+    """
+    Deletes exactly the given objects in `batch_size` batches with up to `workers` delete requests in flight.
+    """
+    stats = DeleteStats()
+    object_names = iter(object_names)
+    pending: deque[tuple[int, Future]] = deque()
+
+    def collect(batch_length: int, future: Future):
+        try:
+            failed = future.result()
+        except Exception as e:
+            logger.error(f'Failed to delete {batch_length} objects in {bucket_name=}', exc_info=e)
+            failed = batch_length
+
+        stats.deleted += batch_length - failed
+        stats.failed += failed
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-delete') as executor:
+        while batch := list(itertools.islice(object_names, batch_size)):
+            pending.append((len(batch), executor.submit(_delete_batch, bucket_name, batch)))
+
+            if len(pending) >= workers:
+                collect(*pending.popleft())
+
+        while pending:
+            collect(*pending.popleft())
+
+    stats.finished = time.monotonic()
+
+    return stats
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import itertools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncGenerator, BinaryIO, Callable, Iterable, Iterator, TypeVar
+
+from minio.datatypes import Object
+from minio.deleteobjects import DeleteError
+
+from python3_commons import object_storage
+from python3_commons.conf import s3_settings
+from python3_commons.object_storage import DeleteStats
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Executor running the blocking client calls, one thread per connection of the client's pool
+    (`s3_max_pool_connections`), so calls never queue for a connection inside a thread.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=s3_settings.s3_max_pool_connections, thread_name_prefix='object-storage-aio'
+                )
+
+    return _executor
+
+
+async def run(fn: Callable[..., T], *args, **kwargs) -> T:
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def put_object(bucket_name: str, path: str, data: BinaryIO, length: int, part_size: int = 0,
+                     content_type: str = 'application/octet-stream', metadata: dict[str, str] | None = None) -> str:
+    return await run(object_storage.put_object, bucket_name, path, data, length, part_size, content_type, metadata)
+
+
+async def put_object_parallel(bucket_name: str, path: str, data: BinaryIO, part_size: int = 8 * 1024 * 1024,
+                              workers: int = 4, content_type: str = 'application/octet-stream',
+                              retries: int = 3) -> str | None:
+    return await run(
+        object_storage.put_object_parallel, bucket_name, path, data, part_size, workers, content_type, retries
+    )
+
+
+async def get_object(bucket_name: str, path: str, offset: int = 0, length: int = 0) -> bytes:
+    return await run(object_storage.get_object, bucket_name, path, offset, length)
+
+
+async def stat_object(bucket_name: str, path: str) -> Object:
+    return await run(object_storage.stat_object, bucket_name, path)
+
+
+def _take(iterator: Iterator[T], count: int) -> list[T]:
+    return list(itertools.islice(iterator, count))
+
+
+async def list_objects(bucket_name: str, prefix: str, recursive: bool = True,
+                       page_size: int = 1000) -> AsyncGenerator[Object, None]:
+    """
+    Listing pages are fetched in the executor, `page_size` objects per call.
+    """
+    objects = object_storage.list_objects(bucket_name, prefix, recursive)
+
+    try:
+        while page := await run(_take, objects, page_size):
+            for obj in page:
+                yield obj
+    finally:
+        objects.close()
+
+
+async def get_objects(bucket_name: str, path: str, recursive: bool = True,
+                      concurrency: int = 8) -> AsyncGenerator[tuple[str, datetime, bytes], None]:
+    """
+    Same as `object_storage.get_objects`, with up to `concurrency` downloads in flight. Results keep listing order.
+    """
+    pending: deque[tuple[Object, asyncio.Future | None]] = deque()
+
+    async def take() -> tuple[str, datetime, bytes]:
+        obj, future = pending.popleft()
+
+        return obj.object_name, obj.last_modified, await future if future else b''
+
+    try:
+        async for obj in list_objects(bucket_name, path, recursive):
+            future = asyncio.ensure_future(get_object(bucket_name, obj.object_name)) if obj.size else None
+            pending.append((obj, future))
+
+            if len(pending) >= concurrency:
+                yield await take()
+
+        while pending:
+            yield await take()
+    finally:
+        for _, future in pending:
+            if future:
+                future.cancel()
+
+
+async def remove_object(bucket_name: str, object_name: str):
+    await run(object_storage.remove_object, bucket_name, object_name)
+
+
+def _remove_objects(bucket_name: str, prefix: str | None, object_names: list[str] | None) -> list[DeleteError]:
+    return list(object_storage.remove_objects(bucket_name, prefix, object_names) or ())
+
+
+async def remove_objects(bucket_name: str, prefix: str = None, object_names: Iterable[str] = None) -> list[DeleteError]:
+    """
+    Unlike the lazy `object_storage.remove_objects`, deletes right away and returns the errors.
+    """
+    return await run(_remove_objects, bucket_name, prefix, list(object_names) if object_names else None)
+
+
+async def delete_objects(bucket_name: str, object_names: Iterable[str], batch_size: int = 1000,
+                         workers: int = 4) -> DeleteStats:
+    return await run(object_storage.delete_objects, bucket_name, object_names, batch_size, workers)
@@ -1,9 +1,18 @@
+import gzip
+import hashlib
+import io
 from dataclasses import dataclass
-from datetime import datetime, date
+from datetime import datetime, date, UTC
 from decimal import Decimal
+from types import SimpleNamespace
 
 import msgspec
 import pytest
+from minio import S3Error
+from minio.datatypes import Object
+from minio.helpers import ObjectWriteResult
+
+from python3_commons import object_storage
 
 
 @pytest.fixture
@@ -69,3 +78,115 @@ def s3_file_objects() -> tuple:
         ('file_c.txt', datetime(2024, 1, 3), b'KLMNO', ),
         ('file_d.txt', datetime(2024, 1, 4), b'PQRST', ),
     )
+
+
+class FakeResponse(io.BytesIO):
+    def release_conn(self):
+        pass
+
+    def stream(self, amt: int = 64 * 1024):
+        while chunk := self.read(amt):
+            yield chunk
+
+
+class FakeMinio:
+    """
+    In-memory stand-in for the Minio client covering the calls made by `object_storage`. Like urllib3, GETs decode
+    objects stored with a `Content-Encoding: gzip` header.
+    """
+    def __init__(self):
+        self.objects: dict[str, tuple[bytes, datetime, str]] = {}
+        self.headers: dict[str, dict[str, str]] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self.delete_requests = 0
+
+    def put_object(self, bucket_name, object_name, data, length, part_size=0, content_type='application/octet-stream',
+                   metadata=None, **kwargs):
+        content = data.read() if length < 0 else data.read(length)
+        etag = object_storage.MultipartETag(part_size or max(len(content), 1))
+        etag.update(content)
+        self.objects[object_name] = (content, datetime.now(tz=UTC), etag.hexdigest())
+        self.headers[object_name] = {'Content-Type': content_type, **(metadata or {})}
+
+        return ObjectWriteResult(bucket_name, object_name, None, etag.hexdigest(), {})
+
+    def _create_multipart_upload(self, bucket_name, object_name, headers):
+        upload_id = f'{object_name}:{len(self.uploads)}'
+        self.uploads[upload_id] = {}
+
+        return upload_id
+
+    def _upload_part(self, bucket_name, object_name, data, headers, upload_id, part_number):
+        self.uploads[upload_id][part_number] = bytes(data)
+
+        return hashlib.md5(data).hexdigest()
+
+    def _complete_multipart_upload(self, bucket_name, object_name, upload_id, parts):
+        uploaded = self.uploads.pop(upload_id)
+        content = b''.join(uploaded[part.part_number] for part in parts)
+        digests = b''.join(hashlib.md5(uploaded[part.part_number]).digest() for part in parts)
+        etag = f'{hashlib.md5(digests).hexdigest()}-{len(parts)}'
+        self.objects[object_name] = (content, datetime.now(tz=UTC), etag)
+
+        return SimpleNamespace(bucket_name=bucket_name, object_name=object_name, etag=etag)
+
+    def _abort_multipart_upload(self, bucket_name, object_name, upload_id):
+        self.uploads.pop(upload_id)
+        self.aborted.append(upload_id)
+
+    def stat_object(self, bucket_name, object_name):
+        try:
+            content, last_modified, etag = self.objects[object_name]
+        except KeyError:
+            raise S3Error('NoSuchKey', 'Object does not exist', object_name, None, None, None) from None
+
+        return Object(bucket_name, object_name, last_modified, etag, len(content))
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0):
+        self.stat_object(bucket_name, object_name)
+        content = self.objects[object_name][0]
+
+        if self.headers.get(object_name, {}).get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+
+        return FakeResponse(content[offset:offset + length] if length else content[offset:])
+
+    def list_objects(self, bucket_name, prefix=None, recursive=False):
+        prefix = prefix or ''
+        dirs = set()
+
+        for object_name in sorted(self.objects):
+            if not object_name.startswith(prefix):
+                continue
+
+            if not recursive and '/' in (name := object_name.removeprefix(prefix)):
+                if (dir_name := f'{prefix}{name.split("/", 1)[0]}/') not in dirs:
+                    dirs.add(dir_name)
+
+                    yield Object(bucket_name, dir_name)
+            else:
+                yield self.stat_object(bucket_name, object_name)
+
+    def remove_object(self, bucket_name, object_name):
+        self.objects.pop(object_name, None)
+        self.headers.pop(object_name, None)
+
+    def remove_objects(self, bucket_name, delete_object_list):
+        self.delete_requests += 1
+
+        for delete_object in delete_object_list:
+            self.objects.pop(delete_object._name, None)
+            self.headers.pop(delete_object._name, None)
+
+        yield from ()
+
+
+@pytest.fixture
+def fake_s3(mocker) -> FakeMinio:
+    client = FakeMinio()
+    storage = mocker.Mock()
+    storage.get_client.return_value = client
+    mocker.patch.object(object_storage, 'ObjectStorage', return_value=storage)
+
+    return client
@@ -1,10 +1,38 @@
+import asyncio
+import bz2
+import os
+import subprocess
+import sys
+import tarfile
+import textwrap
+import threading
+from datetime import datetime
 from io import BytesIO
 
+import pytest
+from lxml import etree
+
+from python3_commons import audit
 from python3_commons.audit import GeneratedStream, generate_archive, generate_bzip2
+from python3_commons.audit_spool import AuditSpool
+from python3_commons.conf import s3_settings
+
+
+def make_reference_archive(objects) -> bytes:
+    archive_data = BytesIO()
+
+    with tarfile.open(fileobj=archive_data, mode='w') as archive:
+        for name, last_modified, content in objects:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = last_modified.timestamp()
+            archive.addfile(info, BytesIO(content))
+
+    return archive_data.getvalue()
 
 
 def test_generated_stream(s3_file_objects):
-    expected_data = b''
+    expected_data = bz2.compress(make_reference_archive(s3_file_objects))
     generator = generate_archive(s3_file_objects, chunk_size=5 * 1024 * 1024)
     bzip2_generator = generate_bzip2(generator)
     archive_stream = GeneratedStream(bzip2_generator)
@@ -17,7 +45,7 @@ def test_generated_stream(s3_file_objects):
 
 
 def test_generated_stream_by_chunks(s3_file_objects):
-    expected_data = b''
+    expected_data = bz2.compress(make_reference_archive(s3_file_objects))
     generator = generate_archive(s3_file_objects, chunk_size=2)
     bzip2_generator = generate_bzip2(generator)
     archive_stream = GeneratedStream(bzip2_generator)
@@ -29,3 +57,362 @@ def test_generated_stream_by_chunks(s3_file_objects):
             archived_data.write(chunk)
 
     assert archived_data.getvalue() == expected_data
+
+
+def test_write_audit_data_runs_off_loop(mocker):
+    calls = []
+    write_sync = mocker.patch.object(
+        audit, 'write_audit_data_sync', side_effect=lambda *args: calls.append(threading.current_thread())
+    )
+
+    async def main():
+        await asyncio.gather(*(audit.write_audit_data(s3_settings, f'key_{i}', b'data') for i in range(4)))
+
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+
+    assert write_sync.call_count == 4
+    assert all(thread is not loop_thread for thread in calls)
+
+
+def test_audit_sink_drains_on_close(mocker):
+    written = []
+
+    async def write(settings, key, data):
+        await asyncio.sleep(0)
+        written.append(key)
+
+        return True
+
+    mocker.patch.object(audit, 'write_audit_data', side_effect=write)
+
+    async def main():
+        sink = audit.AuditSink(max_size=5, workers=2, overflow='block')
+
+        for i in range(10):
+            sink.put_nowait(f'key_{i}', b'data')
+
+        await sink.close()
+
+        return sink
+
+    sink = asyncio.run(main())
+
+    assert sorted(written) == sorted(f'key_{i}' for i in range(10))
+    assert sink.stats.written == 10
+    assert sink.stats.max_depth == 5
+    assert sink.depth == 0
+
+
+def test_audit_sink_overflow_policies(mocker):
+    mocker.patch.object(audit, 'write_audit_data', return_value=True)
+    spilled = []
+
+    async def main():
+        dropping_sink = audit.AuditSink(max_size=2, workers=1, overflow=audit.OverflowPolicy.DROP_OLDEST)
+        spilling_sink = audit.AuditSink(max_size=2, workers=1, overflow=audit.OverflowPolicy.SPILL,
+                                        spill=lambda key, data: spilled.append(key))
+
+        for i in range(5):
+            await dropping_sink.put(f'key_{i}', b'data')
+            await spilling_sink.put(f'key_{i}', b'data')
+
+        await dropping_sink.close()
+        await spilling_sink.close()
+
+        return dropping_sink, spilling_sink
+
+    dropping_sink, spilling_sink = asyncio.run(main())
+
+    assert dropping_sink.stats.dropped == 3
+    assert dropping_sink.stats.written == 2
+    assert spilling_sink.stats.spilled == 3
+    assert spilled == ['key_2', 'key_3', 'key_4']
+
+
+def test_audit_sink_counts_rejected_spills(mocker, tmp_path):
+    mocker.patch.object(audit, 'write_audit_data', return_value=False)
+    spool = AuditSpool(tmp_path, writer=lambda key, data: False, max_bytes=200)
+
+    def spill(key, data):
+        if key == 'key_4':
+            raise OSError('disk failure')
+
+        return spool.append(key, data)
+
+    async def main():
+        sink = audit.AuditSink(max_size=1, workers=1, overflow=audit.OverflowPolicy.SPILL, spill=spill)
+
+        for i in range(5):
+            sink.put_nowait(f'key_{i}', b'x' * 60)
+
+        await sink.close()
+
+        return sink
+
+    sink = asyncio.run(main())
+    spool.close(upload=False)
+
+    assert (sink.stats.spilled, sink.stats.dropped, sink.stats.failed) == (2, 2, 1)
+    assert spool.stats.appended == 2
+
+
+def test_zeep_audit_plugin_uses_loop_sink(mocker):
+    written = []
+
+    async def write(settings, key, data):
+        await asyncio.sleep(0)
+        written.append(key)
+
+        return True
+
+    mocker.patch.object(audit, 'write_audit_data', side_effect=write)
+    mocker.patch.object(audit.audit_settings, 'audit_sink_max_size', 3)
+    operation = mocker.Mock()
+    operation.name = 'Ping'
+    envelope = etree.fromstring(SOAP_ENVELOPE % b'x')
+
+    async def main():
+        plugin = audit.ZeepAuditPlugin()
+
+        for _ in range(1000):
+            plugin.egress(envelope, {}, operation, None)
+
+        sink = audit.get_loop_audit_sink()
+        depth, waiting = sink.depth, sink.waiting
+        await audit.close_loop_audit_sink()
+
+        return sink, depth, waiting
+
+    sink, depth, waiting = asyncio.run(main())
+
+    assert (depth, waiting) == (3, 3)
+    assert len(written) == sink.stats.written == 6
+    assert sink.stats.dropped == 994
+
+
+def test_audit_sink_submit_from_other_threads(mocker):
+    mocker.patch.object(audit, 'write_audit_data', return_value=True)
+    sink = audit.AuditSink(workers=1)
+
+    with pytest.raises(RuntimeError, match='no running event loop'):
+        sink.submit('key', b'data')
+
+    async def main():
+        sink.submit('key_0', b'data')
+        await asyncio.to_thread(sink.submit, 'key_1', b'data')
+        await sink.close()
+
+    asyncio.run(main())
+
+    assert sink.stats.written == 2
+
+
+def test_threaded_audit_sink(mocker):
+    written = []
+    write = mocker.patch.object(audit, 'write_audit_data_sync', side_effect=lambda s, key, data: written.append(key))
+    sink = audit.ThreadedAuditSink(max_size=4, workers=2)
+    threads = [
+        threading.Thread(target=lambda n=n: [sink.submit(f'key_{n}_{i}', b'data') for i in range(25)])
+        for n in range(4)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    sink.shutdown()
+    sink.submit('late_key', b'data')
+
+    assert write.call_count == 101
+    assert len(set(written)) == 101 and written[-1] == 'late_key'
+    assert sink.stats.max_depth <= 4
+    assert {thread.name for thread in threading.enumerate()}.isdisjoint({'audit-sink', 'audit-sink-writer-0'})
+
+
+def test_background_audit_sink_drains_at_exit():
+    script = textwrap.dedent("""
+        import atexit
+        import threading
+        import time
+        from types import SimpleNamespace
+
+        from lxml import etree
+
+        from python3_commons import audit
+
+        written = []
+        plugin = audit.ZeepAuditPlugin()
+        operation = SimpleNamespace(name='Ping')
+        envelope = etree.fromstring(b'<Envelope><Body><Ping/></Body></Envelope>')
+
+
+        def write(settings, key, data):
+            time.sleep(0.01)
+            written.append(key)
+
+            return True
+
+
+        def call_later():
+            time.sleep(0.2)
+
+            for _ in range(5):
+                plugin.egress(envelope, {}, operation, None)
+
+
+        audit.write_audit_data_sync = write
+        atexit.register(lambda: print(len(written), audit.get_background_audit_sink().stats.failed, plugin.failed))
+
+        for _ in range(20):
+            plugin.egress(envelope, {}, operation, None)
+
+        threading.Thread(target=call_later).start()
+    """)
+    result = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, timeout=30,
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}
+    )
+
+    assert result.stdout.split() == ['25', '0', '0'], result.stderr
+
+
+def test_audit_sink_batches(mocker):
+    batches = []
+    mocker.patch.object(audit, 'write_audit_data_sync', return_value=True)
+    write_batch = mocker.patch.object(
+        audit, 'write_audit_batch_sync', side_effect=lambda settings, records: batches.append(records) or True
+    )
+
+    async def main():
+        sink = audit.AuditSink(max_size=100, workers=1, batch_max_records=10, batch_max_delay=0.05)
+
+        for i in range(25):
+            await sink.put(f'2024/01/01/zeep/Op/key_{i}', b'data')
+
+        await sink.close()
+
+        return sink
+
+    sink = asyncio.run(main())
+
+    assert write_batch.call_count == 3
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    assert sink.stats.written == 25
+
+
+def test_generate_archive_stream_matches_tarfile(s3_file_objects):
+    objects = (*s3_file_objects, ('dir/file_e.txt', datetime(2024, 1, 5), b'U' * 70000))
+    streams = ((name, last_modified, len(content), BytesIO(content)) for name, last_modified, content in objects)
+    archived_data = b''.join(audit.generate_archive_stream(streams, chunk_size=4096))
+
+    assert archived_data == make_reference_archive(objects)
+
+
+def test_generated_stream_readinto():
+    chunks = [b'abc', b'', bytearray(b'defgh'), memoryview(b'ijklmnop')[2:]]
+    stream = GeneratedStream(iter(chunks))
+    buffer = bytearray(4)
+    result = []
+
+    while size := stream.readinto(buffer):
+        result.append(bytes(buffer[:size]))
+
+    assert result == [b'abcd', b'efgh', b'klmn', b'op']
+
+    stream = GeneratedStream(iter([b'abc', b'def']))
+
+    assert stream.read(3) == b'abc'
+    assert stream.read(1) == b'd'
+    assert stream.read() == b'ef'
+    assert stream.read() == b''
+
+
+SOAP_ENVELOPE = b'''<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body><Ping>%s</Ping></soap:Body></soap:Envelope>'''
+SOAP_FAULT = b'''<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+<soap:Body><soap:Fault><faultcode>soap:Server</faultcode></soap:Fault></soap:Body></soap:Envelope>'''
+
+
+def test_zeep_audit_plugin_policies(mocker):
+    sink = mocker.Mock(spec=['submit'])
+    tostring = mocker.spy(audit.etree, 'tostring')
+    mocker.patch.object(audit.random, 'random', return_value=0.5)
+    plugin = audit.ZeepAuditPlugin(sink=sink, policies={
+        'Ping': audit.AuditPolicy(sample_rate=0.1),
+        'Lookup': audit.AuditPolicy(directions=frozenset({'egress'}), max_size=64),
+    })
+    ping, lookup = mocker.Mock(), mocker.Mock()
+    ping.name, lookup.name = 'Ping', 'Lookup'
+    envelope = etree.fromstring(SOAP_ENVELOPE % (b'x' * 100))
+
+    plugin.egress(envelope, {}, ping, None)
+    plugin.ingress(envelope, {}, ping)
+    plugin.ingress(envelope, {}, lookup)
+
+    assert plugin.skipped == 3
+    assert tostring.call_count == 0
+
+    plugin.ingress(etree.fromstring(SOAP_FAULT), {}, ping)
+    plugin.egress(envelope, {}, lookup, None)
+
+    (fault_key, fault_xml), (lookup_key, lookup_xml) = (call.args for call in sink.submit.call_args_list)
+
+    assert fault_key.split('/')[4:5] == ['Ping'] and fault_key.endswith('_ingress.xml') and b'Fault' in fault_xml
+    xml = etree.tostring(envelope, encoding='UTF-8')
+
+    assert lookup_xml == xml[:64] + b'\n<!-- audit: truncated, original size %d bytes -->\n' % len(xml)
+
+
+def test_zeep_audit_plugin_samples_exchanges(mocker):
+    stored = []
+    sink = mocker.Mock(spec=['submit'])
+    sink.submit.side_effect = lambda key, data: stored.append((asyncio.current_task(), key.rsplit('_', 1)[-1]))
+    plugin = audit.ZeepAuditPlugin(sink=sink, default_policy=audit.AuditPolicy(sample_rate=0.2))
+    operation = mocker.Mock()
+    operation.name = 'Ping'
+    envelope = etree.fromstring(SOAP_ENVELOPE % b'x')
+
+    async def call():
+        plugin.egress(envelope, {}, operation, None)
+        await asyncio.sleep(0)
+        plugin.ingress(envelope, {}, operation)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(500)))
+
+    asyncio.run(main())
+    exchanges = {}
+
+    for task, direction in stored:
+        exchanges.setdefault(task, []).append(direction)
+
+    assert 0 < len(exchanges) < 200
+    assert all(directions == ['egress.xml', 'ingress.xml'] for directions in exchanges.values())
+    assert plugin.skipped == 1000 - len(stored)
+
+
+def test_serialize_envelope():
+    envelope = etree.fromstring(SOAP_ENVELOPE % b'x')
+
+    assert audit.serialize_envelope(envelope, 'compact') == etree.tostring(envelope, encoding='UTF-8')
+    assert len(audit.serialize_envelope(envelope, 'pretty')) > len(audit.serialize_envelope(envelope, 'compact'))
+    assert audit.serialize_envelope(envelope, 'c14n') == audit.serialize_envelope(
+        etree.fromstring(SOAP_ENVELOPE.replace(b'<soap:Body>', b'<soap:Body  >') % b'x'), 'c14n'
+    )
+
+
+def test_generate_archive_matches_tarfile_without_copying():
+    objects = [
+        ('audit/empty.xml', datetime(2024, 5, 3, 10), b''),
+        ('audit/block.xml', datetime(2024, 5, 3, 10, 0, 1, 500000), b'b' * 512),
+        (f'audit/{"long" * 40}/ünïcode.xml', datetime(2024, 5, 3, 10, 0, 2), b'<a>x</a>' * 1000),
+    ]
+    chunks = list(generate_archive(objects))
+
+    assert b''.join(chunks) == make_reference_archive(objects)
+    assert [chunk.obj for chunk in chunks if isinstance(chunk, memoryview)] == [objects[1][2], objects[2][2]]
+    assert b''.join(generate_archive(objects, chunk_size=100)) == make_reference_archive(objects)
@@ -0,0 +1,182 @@
+import asyncio
+import bz2
+import tarfile
+from datetime import date, datetime
+from io import BytesIO
+
+import pytest
+
+from python3_commons import audit_archive, audit_cli, object_storage
+from python3_commons.audit_archive import ArchiveIndex, generate_indexed_archive
+from python3_commons.serializers.msgspec import deserialize_msgpack, serialize_msgpack
+
+
+@pytest.fixture
+def archive_objects() -> list:
+    return [
+        (f'audit/2024/05/03/zeep/Op/{i:06}_egress.xml', datetime(2024, 5, 3, 0, 0, i % 60), (b'<a>%d</a>' % i) * i)
+        for i in range(200)
+    ] + [('audit/2024/05/03/zeep/Op/large_egress.xml', datetime(2024, 5, 3, 1), bytes(range(256)) * 200)]
+
+
+def build_archive(objects, frame_size: int) -> tuple[bytes, ArchiveIndex]:
+    index = ArchiveIndex('audit/.archive/2024_05_03.tar.bz2', 'bz2')
+    streams = ((name, last_modified, len(content), BytesIO(content)) for name, last_modified, content in objects)
+    archive_data = b''.join(generate_indexed_archive(streams, index, level=1, frame_size=frame_size))
+
+    return archive_data, deserialize_msgpack(serialize_msgpack(index), data_type=ArchiveIndex)
+
+
+def test_indexed_archive_is_a_regular_tar_bz2(archive_objects):
+    archive_data, index = build_archive(archive_objects, frame_size=16 * 1024)
+
+    with tarfile.open(fileobj=BytesIO(bz2.decompress(archive_data)), mode='r') as archive:
+        contents = [(member.name, archive.extractfile(member).read()) for member in archive.getmembers()]
+
+    assert contents == [(name, content) for name, _, content in archive_objects]
+    assert len(index.frames) > 1
+    assert index.frames[-1].compressed_offset + index.frames[-1].compressed_size == len(archive_data)
+
+
+def test_fetch_archived_audit(mocker, archive_objects):
+    archive_data, index = build_archive(archive_objects, frame_size=4 * 1024)
+    mocker.patch.object(object_storage, 'get_object',
+                        side_effect=lambda bucket_name, path, offset, length: archive_data[offset:offset + length])
+
+    for name, _, content in archive_objects[::7] + archive_objects[-1:]:
+        assert audit_archive.fetch_archived_audit(name.removeprefix('audit/'), index=index) == content
+
+    assert audit_archive.fetch_archived_audit('2024/05/03/zeep/Op/missing.xml', index=index) is None
+
+
+def test_archive_audit_range_skips_archived_days(mocker):
+    archived_days = {date(2024, 5, 2)}
+    mocker.patch.object(
+        audit_archive, 'get_archive_marker', side_effect=lambda bucket_name, day: {} if day in archived_days else None
+    )
+    mocker.patch.object(object_storage, 'list_objects', side_effect=lambda *args, **kwargs: iter(()))
+
+    results = asyncio.run(audit_archive.archive_audit_range(date(2024, 5, 1), date(2024, 5, 3), workers=2))
+
+    assert [(result.day, result.status) for result in results] == [
+        (date(2024, 5, 1), 'empty'),
+        (date(2024, 5, 2), 'skipped'),
+        (date(2024, 5, 3), 'empty'),
+    ]
+
+
+def test_archive_audit_day(fake_s3, archive_objects):
+    for name, last_modified, content in archive_objects:
+        fake_s3.objects[name] = (content, last_modified, '')
+
+    fake_s3.objects['audit/2024/05/04/zeep/Op/next_day.xml'] = (b'<a/>', datetime(2024, 5, 4), '')
+
+    result = audit_archive.archive_audit_day(date(2024, 5, 3))
+    marker = audit_archive.get_archive_marker(None, date(2024, 5, 3))
+    index = audit_archive.get_archive_index(None, date(2024, 5, 3))
+
+    assert (result.status, result.objects) == ('archived', len(archive_objects))
+    assert marker['deleted'] and marker['deleted_objects'] == len(archive_objects)
+    assert sorted(fake_s3.objects) == [
+        'audit/.archive/2024_05_03.done',
+        'audit/.archive/2024_05_03.tar.bz2',
+        'audit/.archive/2024_05_03.tar.index',
+        'audit/2024/05/04/zeep/Op/next_day.xml',
+    ]
+
+    name, _, content = archive_objects[42]
+
+    assert audit_archive.fetch_archived_audit(name.removeprefix('audit/'), index=index) == content
+    assert audit_archive.archive_audit_day(date(2024, 5, 3)).status == 'skipped'
+
+
+def test_restore_audit_day(fake_s3, archive_objects):
+    for name, last_modified, content in archive_objects:
+        fake_s3.objects[name] = (content, last_modified, '')
+
+    audit_archive.archive_audit_day(date(2024, 5, 3))
+    result = audit_archive.restore_audit_day(date(2024, 5, 3), target_root='restore/case-42', workers=3)
+
+    assert (result.status, result.objects) == ('restored', len(archive_objects))
+    assert [fake_s3.objects[f'restore/case-42/{name.removeprefix("audit/")}'][0] for name, _, _ in archive_objects] == [
+        content for _, _, content in archive_objects
+    ]
+
+    assert audit_cli.main(['restore', '--start', '2024-05-03', '--end', '2024-05-04']) == 0
+    assert [fake_s3.objects[name][0] for name, _, _ in archive_objects] == [
+        content for _, _, content in archive_objects
+    ]
+    assert audit_archive.restore_audit_day(date(2024, 5, 4)).status == 'missing'
+
+
+def test_restore_audit_day_from_unindexed_archive(fake_s3, archive_objects):
+    buffer = BytesIO()
+
+    with tarfile.open(fileobj=buffer, mode='w:bz2') as tar:
+        for name, last_modified, content in archive_objects:
+            info = tarfile.TarInfo(name)
+            info.size, info.mtime = len(content), last_modified.timestamp()
+            tar.addfile(info, BytesIO(content))
+
+    fake_s3.objects['audit/.archive/2024_05_03.tar.bz2'] = (buffer.getvalue(), datetime(2024, 5, 4), '')
+    result = audit_archive.restore_audit_day(date(2024, 5, 3), target_root='restore')
+
+    assert (result.status, result.objects) == ('restored', len(archive_objects))
+    assert [fake_s3.objects[name.replace('audit/', 'restore/', 1)][0] for name, _, _ in archive_objects] == [
+        content for _, _, content in archive_objects
+    ]
+
+
+def test_archive_audit_day_appends_late_objects(fake_s3, archive_objects):
+    day = date(2024, 5, 3)
+    early, late = archive_objects[:5], archive_objects[5:6]
+
+    for name, last_modified, content in early:
+        fake_s3.objects[name] = (content, last_modified, '')
+
+    assert audit_archive.archive_audit_day(day).status == 'archived'
+    assert audit_archive.archive_audit_day(day).status == 'skipped'
+
+    for name, last_modified, content in late:
+        fake_s3.objects[name] = (content, last_modified, '')
+
+    assert audit_archive.archive_audit_day(day, dry_run=True).objects == 1
+    assert (audit_archive.archive_audit_day(day).status, fake_s3.objects.keys() & {late[0][0]}) == (
+        'archived', set()
+    )
+
+    marker = audit_archive.get_archive_marker(None, day)
+    indexes = audit_archive.get_archive_indexes(None, day)
+
+    assert (marker['generation'], marker['objects'], marker['deleted']) == (1, 6, True)
+    assert [len(index.members) for index in indexes] == [5, 1]
+    assert indexes[1].archive == 'audit/.archive/2024_05_03.1.tar.bz2'
+    assert [audit_archive.fetch_archived_audit(name.removeprefix('audit/')) for name, _, _ in early + late] == [
+        content for _, _, content in early + late
+    ]
+
+    assert audit_archive.restore_audit_day(day).objects == 6
+    assert audit_archive.archive_audit_day(day).status == 'archived'
+    assert [len(index.members) for index in audit_archive.get_archive_indexes(None, day)] == [5, 1, 6]
+
+
+def test_restore_audit_day_verifies_large_members(mocker, fake_s3, archive_objects):
+    mocker.patch.object(audit_archive, 'RESTORE_MEMBER_BUFFER_SIZE', 1024)
+
+    for name, last_modified, content in archive_objects:
+        fake_s3.objects[name] = (content, last_modified, '')
+
+    audit_archive.archive_audit_day(date(2024, 5, 3))
+    large_name, _, large_content = archive_objects[-1]
+
+    assert audit_archive.restore_audit_day(date(2024, 5, 3), target_root='restore').objects == len(archive_objects)
+    assert fake_s3.objects[large_name.replace('audit/', 'restore/', 1)][0] == large_content
+
+    index = audit_archive.get_archive_index(None, date(2024, 5, 3))
+    index.find_member(large_name).checksum = '0' * 64
+    fake_s3.objects['audit/.archive/2024_05_03.tar.index'] = (serialize_msgpack(index), datetime(2024, 5, 4), '')
+
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        audit_archive.restore_audit_day(date(2024, 5, 3), target_root='corrupt')
+
+    assert large_name.replace('audit/', 'corrupt/', 1) not in fake_s3.objects
@@ -0,0 +1,109 @@
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, UTC
+
+from unittest.mock import patch
+
+import pytest
+
+from python3_commons import audit_archive, audit_keys
+from python3_commons.audit_query import iter_audit
+from python3_commons.conf import audit_settings
+
+
+def mock_time(ms: int):
+    return patch.object(audit_keys.time, 'time_ns', return_value=ms * 1_000_000)
+
+
+def test_object_keys_are_spread_over_shards():
+    keys = [f'2024/05/03/zeep/GetUser/101500_{i:012}_egress.xml' for i in range(1600)]
+    object_keys = [audit_keys.get_object_key(key, shards=16) for key in keys]
+    shard_counts = Counter(object_key.split('/', 1)[0] for object_key in object_keys)
+
+    assert audit_keys.get_shard_names(16) == [f'{shard:x}' for shard in range(16)]
+    assert audit_keys.get_shard_names(1) == []
+    assert sorted(shard_counts) == audit_keys.get_shard_names(16)
+    assert min(shard_counts.values()) > 50
+    assert [audit_keys.get_logical_key(object_key) for object_key in object_keys] == keys
+    assert audit_keys.get_object_key(keys[0], shards=1) == keys[0]
+    assert audit_keys.get_logical_key(keys[0]) == keys[0]
+
+    with pytest.raises(ValueError):
+        audit_keys.get_shard_names(257)
+
+
+def test_sharded_layout_is_archived_and_queried(mocker, fake_s3):
+    mocker.patch.object(audit_settings, 'audit_key_shards', 16)
+    keys = [f'2024/05/03/zeep/GetUser/{i:02}0000_{i:012}_egress.xml' for i in range(20)]
+
+    for i, key in enumerate(keys):
+        fake_s3.objects[f'audit/{audit_keys.get_object_key(key)}'] = (b'<a>%d</a>' % i, datetime(2024, 5, 3), '')
+
+    fake_s3.objects[f'audit/{keys[0].replace("GetUser", "Legacy")}'] = (b'<legacy/>', datetime(2024, 5, 3), '')
+    old_key = audit_keys.get_object_key(keys[0].replace('GetUser', 'Resharded'), shards=256)
+    fake_s3.objects[f'audit/{old_key}'] = (b'<resharded/>', datetime(2024, 5, 3), '')
+
+    live = list(iter_audit(since=datetime(2024, 5, 3, tzinfo=UTC), until=datetime(2024, 5, 3, 23, tzinfo=UTC)))
+
+    assert len(live) == 22
+
+    result = audit_archive.archive_audit_day(date(2024, 5, 3))
+
+    assert (result.status, result.objects) == ('archived', 22)
+    assert not [name for name in fake_s3.objects if not name.startswith('audit/.archive/')]
+    assert audit_archive.fetch_archived_audit(keys[7]) == b'<a>7</a>'
+
+    archived = list(iter_audit(
+        name='zeep', operation='GetUser', since=datetime(2024, 5, 3, tzinfo=UTC),
+        until=datetime(2024, 5, 3, 23, tzinfo=UTC)
+    ))
+
+    assert sorted(record.key for record in archived) == keys
+
+
+def test_key_ids_are_time_ordered():
+    generator = audit_keys.KeyIdGenerator()
+    ids = []
+    threads = [
+        threading.Thread(target=lambda: ids.extend(generator.generate()[1] for _ in range(500))) for _ in range(4)
+    ]
+
+    with mock_time(1714694400123):
+        same_ms = [generator.generate() for _ in range(100)]
+
+    assert [key_id for _, key_id in same_ms] == sorted(key_id for _, key_id in same_ms)
+    assert {date_path for date_path, _ in same_ms} == {'2024/05/03'}
+    assert audit_keys.get_key_time(f'2024/05/03/zeep/Op/{same_ms[0][1]}_egress.xml') == datetime(
+        2024, 5, 3, 0, 0, 0, 123000, tzinfo=UTC
+    )
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == 2000 and all(len(key_id) == audit_keys.KEY_ID_LENGTH for key_id in ids)
+    assert generator.generate()[1] > max(ids) > same_ms[-1][1]
+
+
+def test_archive_is_in_event_order(fake_s3):
+    started = datetime(2024, 5, 3, 10, tzinfo=UTC)
+    keys = []
+
+    for i in range(30):
+        generator = audit_keys.KeyIdGenerator()
+        ms = int((started + timedelta(milliseconds=i * 7)).timestamp() * 1000)
+
+        with mock_time(ms):
+            _, key_id = generator.generate()
+
+        keys.append(f'2024/05/03/zeep/{"CBA"[i % 3]}/{key_id}_egress.xml')
+
+    for key in reversed(keys):
+        fake_s3.objects[f'audit/{key}'] = (b'<a/>', datetime(2024, 5, 3), '')
+
+    audit_archive.archive_audit_day(date(2024, 5, 3))
+    index = audit_archive.get_archive_index(None, date(2024, 5, 3))
+
+    assert [member.name for member in index.members] == [f'audit/{key}' for key in keys]
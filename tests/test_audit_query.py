@@ -0,0 +1,79 @@
+import gzip
+from datetime import datetime, timedelta, UTC
+
+from lxml import etree
+
+from python3_commons import audit, audit_archive, audit_segments
+from python3_commons.audit_query import iter_audit, parse_audit_key
+
+
+def put_audit_objects(fake_s3, day: str, operation: str, count: int):
+    for i in range(count):
+        for direction in ('egress', 'ingress'):
+            key = f'audit/{day}/zeep/{operation}/{i:02}0000_{i:012}_{direction}.xml'
+            fake_s3.objects[key] = (f'<{operation}>{i}</{operation}>'.encode(), datetime(2024, 5, 3), '')
+
+
+def test_parse_audit_key():
+    audit_key = parse_audit_key('2024/05/03/zeep/GetUser/134501_0123456789ab_ingress.xml')
+
+    assert (audit_key.name, audit_key.operation, audit_key.direction) == ('zeep', 'GetUser', 'ingress')
+    assert audit_key.timestamp == datetime(2024, 5, 3, 13, 45, 1, tzinfo=UTC)
+    assert parse_audit_key('2024/05/03/.segments/134501_0123456789ab.seg') is None
+
+
+def test_iter_audit_over_archive_and_live_objects(fake_s3):
+    put_audit_objects(fake_s3, '2024/05/03', 'GetUser', 5)
+    put_audit_objects(fake_s3, '2024/05/03', 'SetUser', 5)
+    assert audit_archive.archive_audit_day(datetime(2024, 5, 3).date()).status == 'archived'
+
+    put_audit_objects(fake_s3, '2024/05/04', 'GetUser', 3)
+    segment = audit_segments.encode_segment([
+        ('2024/05/04/zeep/GetUser/050000_00000000000a_egress.xml', b'<GetUser>segment</GetUser>'),
+        ('2024/05/04/zeep/SetUser/050000_00000000000b_egress.xml', b'<SetUser>segment</SetUser>'),
+    ])
+    fake_s3.objects['audit/2024/05/04/.segments/050000000000_00000000000c.seg'] = (segment, datetime(2024, 5, 4), '')
+
+    records = list(iter_audit(
+        name='zeep', operation='GetUser', direction='egress',
+        since=datetime(2024, 5, 3, 1, tzinfo=UTC), until=datetime(2024, 5, 4, 23, tzinfo=UTC)
+    ))
+
+    assert [(record.timestamp.day, record.data) for record in records] == [
+        (3, b'<GetUser>1</GetUser>'),
+        (3, b'<GetUser>2</GetUser>'),
+        (3, b'<GetUser>3</GetUser>'),
+        (3, b'<GetUser>4</GetUser>'),
+        (4, b'<GetUser>0</GetUser>'),
+        (4, b'<GetUser>1</GetUser>'),
+        (4, b'<GetUser>2</GetUser>'),
+        (4, b'<GetUser>segment</GetUser>'),
+    ]
+    assert {record.direction for record in records} == {'egress'}
+    assert len(list(iter_audit(since=datetime(2024, 5, 3), until=datetime(2024, 5, 3, 23, 59, 59)))) == 20
+
+
+def test_iter_audit_decodes_compressed_records(mocker, fake_s3):
+    mocker.patch.object(audit, 'ObjectStorage', return_value=mocker.Mock(get_client=lambda: fake_s3))
+    settings = mocker.Mock(s3_bucket=None, s3_secret_access_key='secret')
+    sink = mocker.Mock(spec=['submit'])
+    operation = mocker.Mock()
+    operation.name = 'GetUser'
+    envelope = etree.fromstring(b'<Envelope><Body><GetUser>%s</GetUser></Body></Envelope>' % (b'x' * 1000))
+    audit.ZeepAuditPlugin(sink=sink, record_codec='gzip').egress(envelope, {}, operation, None)
+    key, xml = sink.submit.call_args.args
+
+    assert key.endswith('_egress.xml.gz') and xml == etree.tostring(envelope, encoding='UTF-8')
+    assert audit.write_audit_data_sync(settings, key, xml)
+
+    stored, _, _ = fake_s3.objects[f'audit/{key}']
+    records = list(iter_audit(name='zeep', since=datetime.now(tz=UTC) - timedelta(days=1)))
+
+    assert gzip.decompress(stored) == xml and len(stored) < 100
+    assert fake_s3.headers[f'audit/{key}'] == {'Content-Type': 'application/gzip'}
+    assert [(record.key, record.direction, record.data) for record in records] == [(key, 'egress', xml)]
+
+    # A Content-Encoding header would have the HTTP client hand out decompressed bodies, see `FakeMinio.get_object`
+    assert audit_archive.archive_audit_day(records[0].timestamp.date()).status == 'archived'
+    assert audit_archive.fetch_archived_audit(key) == stored
+    assert [record.data for record in iter_audit(name='zeep', since=datetime.now(tz=UTC) - timedelta(days=1))] == [xml]
@@ -0,0 +1,32 @@
+import pytest
+
+from python3_commons.audit_segments import (encode_segment, group_by_date_path, is_segment_key, iter_segment_records,
+                                            make_segment_key, read_segment_index)
+
+
+def test_encode_decode_segment():
+    records = [
+        ('2024/01/01/zeep/Op/000000_a_egress.xml', b'<a/>'),
+        ('2024/01/01/zeep/Op/000000_a_ingress.xml', b''),
+        ('2024/01/01/zeep/Other/000001_b_egress.xml', b'<b>' * 1000),
+    ]
+    segment = encode_segment(records)
+
+    assert list(iter_segment_records(segment)) == records
+    assert [key for key, _, _ in read_segment_index(segment)] == [key for key, _ in records]
+
+
+def test_invalid_segment():
+    with pytest.raises(ValueError):
+        read_segment_index(b'not a segment at all')
+
+
+def test_segment_keys():
+    groups = group_by_date_path([('2024/01/01/a', b''), ('2024/01/02/b', b''), ('2024/01/01/c', b'')])
+    key = make_segment_key('2024/01/01')
+
+    assert list(groups) == ['2024/01/01', '2024/01/02']
+    assert [k for k, _ in groups['2024/01/01']] == ['2024/01/01/a', '2024/01/01/c']
+    assert key.startswith('2024/01/01/.segments/')
+    assert is_segment_key(key)
+    assert not is_segment_key('2024/01/01/zeep/Op/000000_a_egress.xml')
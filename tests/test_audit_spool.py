@@ -0,0 +1,72 @@
+import time
+
+from python3_commons.audit_spool import CORRUPT_SUFFIX, READY_SUFFIX, _LENGTH, AuditSpool, iter_spool_records
+from python3_commons.serializers.msgspec import serialize_msgpack
+
+
+def test_audit_spool_replays_after_outage(tmp_path):
+    available = False
+    uploaded = {}
+
+    def writer(key, data):
+        if available:
+            uploaded[key] = data
+
+        return available
+
+    spool = AuditSpool(tmp_path, writer=writer, segment_max_bytes=64, sync_interval=0.01, retry_max_delay=0.01)
+
+    for i in range(10):
+        assert spool.append(f'key_{i}', b'data' * i)
+
+    assert spool.stats.upload_failures or not uploaded
+    available = True
+    spool.close()
+
+    assert uploaded == {f'key_{i}': b'data' * i for i in range(10)}
+    assert spool.stats.uploaded == 10
+    assert spool.disk_usage == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_audit_spool_disk_budget(tmp_path):
+    spool = AuditSpool(tmp_path, writer=lambda key, data: False, max_bytes=100)
+
+    assert spool.append('key_a', b'a' * 50)
+    assert not spool.append('key_b', b'b' * 50)
+    assert spool.stats.rejected == 1
+
+    spool.close(upload=False)
+
+    assert list(iter_spool_records(next(tmp_path.iterdir()))) == [('key_a', b'a' * 50)]
+
+
+def test_audit_spool_quarantines_undecodable_frames(tmp_path):
+    uploaded = {}
+
+    def writer(key, data):
+        uploaded[key] = data
+
+        return True
+
+    record = serialize_msgpack(['key_a', b'a'])
+    (tmp_path / f'{0:020}{READY_SUFFIX}').write_bytes(_LENGTH.pack(len(record)) + record + b'\0' * 64)
+
+    spool = AuditSpool(tmp_path, writer=writer, sync_interval=0.01, retry_max_delay=0.01)
+
+    for _ in range(100):
+        if spool.stats.quarantined:
+            break
+
+        time.sleep(0.01)
+
+    assert spool._thread.is_alive()
+    assert spool.append('key_b', b'b')
+
+    spool.close()
+
+    assert uploaded == {'key_a': b'a', 'key_b': b'b'}
+    assert spool.stats.quarantined == 1
+    assert spool.disk_usage == 0
+    assert [path.name for path in tmp_path.iterdir()] == [f'{0:020}{CORRUPT_SUFFIX}']
+    assert (tmp_path / f'{0:020}{CORRUPT_SUFFIX}').read_bytes() == b'\0' * 64
@@ -0,0 +1,51 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from python3_commons.compression import (
+    CODECS, generate_compressed, generate_compressed_parallel, generate_decompressed, get_codec
+)
+
+
+@pytest.mark.parametrize('codec_name, decompress', (
+    ('bz2', bz2.decompress),
+    ('gzip', gzip.decompress),
+    ('xz', lzma.decompress),
+))
+def test_generate_compressed(codec_name, decompress):
+    chunks = [b'<soap:Envelope>', b'<data>' * 1000, b'</soap:Envelope>']
+
+    assert decompress(b''.join(generate_compressed(chunks, codec_name, level=1))) == b''.join(chunks)
+
+
+def test_generate_compressed_zstd():
+    zstandard = pytest.importorskip('zstandard')
+    chunks = [b'<soap:Envelope>', b'<data>' * 1000, b'</soap:Envelope>']
+    compressed = b''.join(generate_compressed(chunks, 'zstd'))
+
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(compressed) == b''.join(chunks)
+
+
+def test_get_codec():
+    assert get_codec('gzip') is CODECS['gzip']
+    assert get_codec(CODECS['xz']).extension == '.xz'
+
+    with pytest.raises(ValueError):
+        get_codec('rar')
+
+
+@pytest.mark.parametrize('codec_name, decompress', (
+    ('bz2', bz2.decompress),
+    ('gzip', gzip.decompress),
+    ('xz', lzma.decompress),
+))
+def test_generate_compressed_parallel(codec_name, decompress):
+    data = b''.join(f'<record id="{i}">{i * 7}</record>'.encode() for i in range(20000))
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    compressed = list(generate_compressed_parallel(chunks, codec_name, level=1, block_size=64 * 1024, workers=2))
+
+    assert len(compressed) == -(-len(data) // (64 * 1024))
+    assert decompress(b''.join(compressed)) == data
+    assert b''.join(generate_decompressed(compressed, codec_name)) == data
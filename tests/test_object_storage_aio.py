@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from datetime import datetime, UTC
+from io import BytesIO
+
+from python3_commons.object_storage import aio
+
+
+def test_aio_object_storage(mocker, fake_s3):
+    threads = set()
+    get_object = fake_s3.get_object
+
+    def record_thread(*args, **kwargs):
+        threads.add(threading.current_thread().name)
+
+        return get_object(*args, **kwargs)
+
+    mocker.patch.object(fake_s3, 'get_object', side_effect=record_thread)
+
+    async def scenario():
+        for i in range(25):
+            await aio.put_object('bucket', f'data/{i:02}.xml', BytesIO(b'<a>%d</a>' % i), -1)
+
+        await aio.put_object('bucket', 'data/empty.xml', BytesIO(b''), 0)
+
+        names = [obj.object_name async for obj in aio.list_objects('bucket', 'data/', page_size=7)]
+        objects = [(name, data) async for name, _, data in aio.get_objects('bucket', 'data/', concurrency=4)]
+        stat = await aio.stat_object('bucket', 'data/03.xml')
+        errors = await aio.remove_objects('bucket', prefix='data/1')
+
+        return names, objects, stat, errors, [obj.object_name async for obj in aio.list_objects('bucket', 'data/')]
+
+    names, objects, stat, errors, remaining = asyncio.run(scenario())
+    expected = [(f'data/{i:02}.xml', b'<a>%d</a>' % i) for i in range(25)]
+    expected.append(('data/empty.xml', b''))
+
+    assert names == [name for name, _ in expected]
+    assert objects == expected
+    assert stat.size == 8 and stat.last_modified <= datetime.now(tz=UTC)
+    assert errors == []
+    assert [name for name in remaining if name.startswith('data/1')] == []
+    assert threads and all(name.startswith('object-storage-aio') for name in threads)